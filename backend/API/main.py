@@ -14,6 +14,7 @@ from backend.Agents.Foundations.OpenAIAPI import OpenAIAPI
 from backend.API.AppData import AppData
 from backend.Agents.Foundations.XDigest import TwikitAPI
 from backend.Agents.prompts import FOLLOW_UP_PROMPT
+from backend.Kernels.model_registry import warm_up
 
 # ======================================
 # Flask Configuration and Initialization
@@ -167,6 +168,9 @@ def start_telegram_bot():
 # Main: Start Flask & Telethon
 # ======================================
 if __name__ == "__main__":
+    # Load the embedding model once up front so the first generation does not pay for it
+    warm_up()
+
     # Launch Telegram bot in a background thread so it runs concurrently with Flask.
     telegram_thread = threading.Thread(target=start_telegram_bot)
     telegram_thread.daemon = True
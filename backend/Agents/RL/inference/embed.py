@@ -1,17 +1,26 @@
-from sentence_transformers import SentenceTransformer
+from backend.Kernels.model_registry import get_model
+from backend.Kernels.embedding_service import get_encoder
 
 class Embedor:
-    def __init__(self, model_name='multi-qa-MiniLM-L6-cos-v1'):
+    def __init__(self, model_name='multi-qa-MiniLM-L6-cos-v1', backend=None):
         """
         Initialize the Embedor class with a SentenceTransformer model.
         :param model_name: Name of the model to load from sentence-transformers.
+        :param backend: "torch" or "onnx" (int8 ONNX Runtime); defaults to EMBEDDING_BACKEND.
+        The model is shared process-wide and loaded on first use (see model_registry).
         """
-        self.model = SentenceTransformer(model_name)
+        self.model_name = model_name
+        self.backend = backend
+
+    @property
+    def model(self):
+        return get_model(self.model_name, self.backend)
 
     def embed(self, text: str):
         """
-        Embed the given text using the model.
+        Embed the given text using the model. Concurrent calls are batched together
+        by the shared embedding service.
         :param text: The text to be embedded.
         :return: The vector representation of the text.
         """
-        return self.model.encode(text).tolist()
\ No newline at end of file
+        return get_encoder(self.model_name, self.backend).encode(text).tolist()
\ No newline at end of file
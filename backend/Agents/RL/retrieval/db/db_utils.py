@@ -1,27 +1,184 @@
+import os
+import re
 import json
-import codecs, json 
+import time
+import atexit
+import threading
+
+from backend.Kernels.archive_reader import iter_docs
+
+_GENERATION = re.compile(rb'^\{"generation":\s*(\d+)')
 
 class DBUtils():
-    def __init__(self, db_file):
+    """
+    Article store kept as a snapshot file plus an append-only JSONL log.
+
+    The snapshot is db_file itself, in the original {"data": [...]} layout (with a leading
+    "generation" key once compacted). Records added with put_article are appended to
+    <db_file>.<generation>.log, one JSON value per line, and fsynced in batches. compact()
+    folds the log into a new snapshot of the next generation, automatically once the log
+    outgrows the snapshot, so every record is rewritten a constant number of times on average;
+    a log whose generation does not
+    match the snapshot is stale and removed on open, so a crash mid-compaction never
+    duplicates or loses records.
+    """
+    def __init__(self, db_file, sync_every=32, sync_interval=1.0, compact_ratio=1.0, min_compact_bytes=1 << 20):
+        """
+        Args:
+            db_file (str): Snapshot path, e.g. direct/retrieval/db/content.json.
+            sync_every (int): fsync the log after this many appended records...
+            sync_interval (float): ...or once this many seconds passed since the last fsync.
+            compact_ratio (float): Fold the log into the snapshot once the log is this many times
+                the snapshot's size in bytes; None turns automatic compaction off.
+            min_compact_bytes (int): ...but not before the log holds this many bytes.
+        """
         self.db_file = db_file
-        # open db file (json)
-        self.db = json.load(open(self.db_file, "r"))
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.compact_ratio = compact_ratio
+        self.min_compact_bytes = min_compact_bytes
+        self._lock = threading.RLock()
+        self._log = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self.generation = self._read_generation()
+        self._snapshot_bytes = os.path.getsize(db_file) if os.path.exists(db_file) else 0
+        # byte offset of every record in the current log
+        self.offsets = []
+        self._open_log()
+        atexit.register(self.close)
+
+    def _read_generation(self):
+        if not os.path.exists(self.db_file):
+            return 0
+        with open(self.db_file, "rb") as f:
+            match = _GENERATION.match(f.read(64))
+        return int(match.group(1)) if match else 0
+
+    def _log_path(self, generation):
+        return f"{self.db_file}.{generation}.log"
+
+    def _open_log(self):
+        directory = os.path.dirname(os.path.abspath(self.db_file))
+        prefix = os.path.basename(self.db_file) + "."
+        current = os.path.basename(self._log_path(self.generation))
+        for filename in os.listdir(directory):
+            if filename.startswith(prefix) and filename.endswith(".log") and filename != current:
+                os.remove(os.path.join(directory, filename))
+
+        path = self._log_path(self.generation)
+        self._log = open(path, "a+b")
+        self._log.seek(0)
+        self.offsets = []
+        good_end = 0
+        for line in self._log:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                json.loads(line)
+            except ValueError:
+                break
+            self.offsets.append(good_end)
+            good_end += len(line)
+        if good_end != os.path.getsize(path):
+            # torn write from a crash: drop the partial record
+            print(f"Truncating partial record at byte {good_end} of {path}")
+            self._log.truncate(good_end)
+        self._log.seek(0, os.SEEK_END)
+
+    def _sync(self):
+        self._log.flush()
+        os.fsync(self._log.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
 
     def put_article(self, article):
-        # add article to db
-        self.db["data"].append(article)
-        # write db to file
-        with open(self.db_file, "w") as f:
-            json.dump(self.db, f)
+        # append article to the log; only the new record is written
+        with self._lock:
+            line = (json.dumps(article, separators=(',', ':')) + "\n").encode("utf-8")
+            self.offsets.append(self._log.tell())
+            self._log.write(line)
+            self._unsynced += 1
+            if self._unsynced >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_interval:
+                self._sync()
+            if self.compact_ratio is not None and \
+                    self._log.tell() >= max(self.min_compact_bytes, self.compact_ratio * self._snapshot_bytes):
+                self.compact()
+
+    def flush(self):
+        with self._lock:
+            if self._log is not None and self._unsynced:
+                self._sync()
 
     def write_all_articles(self, articles):
-        # write all articles to db
+        # replace the whole db with articles; a generator is streamed into the next generation's
+        # snapshot, which replaces the current store only once the generator is exhausted
+        with self._lock:
+            self._write_snapshot(articles)
+
+    def compact(self):
+        """Fold the log into a new snapshot so reads no longer replay it."""
+        with self._lock:
+            print(f"Compacting {len(self.offsets)} log records into {self.db_file}")
+            # iter_articles reads the old snapshot while the new one goes to a temp file
+            self._write_snapshot(self.iter_articles())
+
+    def _write_snapshot(self, articles):
+        generation = self.generation + 1
+        tmp_path = self.db_file + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(f'{{"generation": {generation}, "data": [')
+                for i, article in enumerate(articles):
+                    if i:
+                        f.write(",\n")
+                    f.write(json.dumps(article, separators=(',', ':')))
+                f.write("]}")
+                f.flush()
+                os.fsync(f.fileno())
+        except BaseException:
+            # the current snapshot and log are untouched; drop the partial generation
+            os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, self.db_file)
+        self._snapshot_bytes = os.path.getsize(self.db_file)
+        # the new snapshot is durable; switch to an empty log of its generation
+        self._log.close()
+        self.generation = generation
+        self._unsynced = 0
+        self._open_log()
+
+    def read_record(self, position):
+        """Log record number `position` (in append order), read through the offset index."""
+        with self._lock:
+            self._log.flush()
+            with open(self._log_path(self.generation), "rb") as f:
+                f.seek(self.offsets[position])
+                return json.loads(f.readline())
+
+    def iter_articles(self):
+        """Yield every record, snapshot first and then the log, without loading the files whole."""
+        if os.path.exists(self.db_file):
+            yield from iter_docs(self.db_file, path=("data",))
+        with self._lock:
+            self._log.flush()
+            log_end = self._log.tell()
+        with open(self._log_path(self.generation), "rb") as f:
+            while f.tell() < log_end:
+                yield json.loads(f.readline())
+
+    def get_articles(self, lazy=False):
+        if lazy:
+            return self.iter_articles()
+        return list(self.iter_articles())
 
-        json.dump({"data": articles}, codecs.open(self.db_file, 'w', encoding='utf-8'), 
-          separators=(',', ':'), 
-          sort_keys=True, 
-          indent=4)
-        
+    @property
+    def db(self):
+        return {"data": self.get_articles()}
 
-    def get_articles(self):
-        return self.db["data"]
\ No newline at end of file
+    def close(self):
+        with self._lock:
+            if self._log is not None:
+                self.flush()
+                self._log.close()
+                self._log = None
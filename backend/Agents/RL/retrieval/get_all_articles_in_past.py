@@ -1,38 +1,32 @@
 import os
-import json
+from backend.Kernels.archive_reader import iter_docs
 class GetAllArticlesInPast:
-    def __init__(self):
+    def __init__(self, directory="direct/retrieval/"):
         # find all files in directory direct/retrieval/ starting with "all_metadata_"
+        self.directory = directory
         self.raw_files = [
-            f for f in os.listdir("direct/retrieval/") if f.startswith("all_metadata_") and f.endswith(".json")
+            f for f in os.listdir(directory) if f.startswith("all_metadata_") and f.endswith(".json")
         ]
         
         # file format "all_metadata_year_MM.json," get year and month
+        # the docs themselves are streamed from disk on demand, see iter_articles_as_one
         self.files = [
             {
                 "year": int(f.split("_")[2]),
                 "month": int(f.split("_")[3].split(".")[0]),
-                # read file and jsojn load
-                "file": json.load(open("direct/retrieval/" + f, "r"))["response"]["docs"],
+                "path": os.path.join(directory, f),
             }
             for f in self.raw_files
         ]
 
-        for f in self.files:
-            # print(len(f["file"]))
-            pass
-
     def get_articles(self):
-        return self.files
-
-    def get_articles_as_one_list(self):
-        articles = [
-
-        ]
+        return [dict(f, file=list(iter_docs(f["path"]))) for f in self.files]
 
+    def iter_articles_as_one(self):
+        """Yield every article of every file one at a time without loading whole files."""
         for f in self.files:
-            for article in f["file"]:
-                articles.append({
+            for article in iter_docs(f["path"]):
+                yield {
                     "year": f["year"],
                     "month": f["month"],
                     "title": article["headline"]["main"],
@@ -42,9 +36,12 @@ class GetAllArticlesInPast:
                     "keywords": article["keywords"],
                     "all_data": article,
                     "url": article["web_url"],
-                })
-        return articles
+                }
+
+    def get_articles_as_one_list(self):
+        return list(self.iter_articles_as_one())
     
 
 if __name__ == "__main__":
-    GetAllArticlesInPast()
\ No newline at end of file
+    # Run from the repo root: python -m backend.Agents.RL.retrieval.get_all_articles_in_past
+    GetAllArticlesInPast()
@@ -1,6 +1,7 @@
-from db.db_utils import DBUtils
-from get_all_articles_in_past import GetAllArticlesInPast
-from sentence_transformers import SentenceTransformer
+# Run from the repo root: python -m backend.Agents.RL.retrieval.run_vectorization
+from backend.Agents.RL.retrieval.db.db_utils import DBUtils
+from backend.Agents.RL.retrieval.get_all_articles_in_past import GetAllArticlesInPast
+from backend.Kernels.model_registry import get_model
 import codecs, json 
 
 class RunVectorization:
@@ -10,48 +11,47 @@ class RunVectorization:
         # print current directory
         db_file = "direct/retrieval/db/vector.json"
         db_utils = DBUtils(db_file)
-
-        articles = GetAllArticlesInPast().get_articles_as_one_list()
     
     # use SentenceTransformer to vectorize articles
 
         print("Vectorizing articles...")
 
-        model = SentenceTransformer('multi-qa-MiniLM-L6-cos-v1')
-        total_finished = 0
-
-        print(f"Total articles to vectorize: {len(articles)}")
-
-        for article in articles:
-            # vectorize article
-            full_keyword_string = ""
-
-            for keyword in article["keywords"]:
-                full_keyword_string += keyword["name"] + ", "
+        model = get_model('multi-qa-MiniLM-L6-cos-v1')
 
+        def vectorized_articles():
+            total_finished = 0
+            # articles are streamed from the archive files one at a time
+            for article in GetAllArticlesInPast().iter_articles_as_one():
+                # vectorize article
+                full_keyword_string = ""
 
-            full_text = f""" 
-            {article['title']} 
-            \n \
-            {article['abstract']} \
+                for keyword in article["keywords"]:
+                    full_keyword_string += keyword["name"] + ", "
 
-            {article['lead_paragraph']}
 
-            {article['snippet']}
+                full_text = f""" 
+                {article['title']} 
+                \n \
+                {article['abstract']} \
 
-            {full_keyword_string}
-            """
-            article["encoded_text"] = full_text
-            article["vector"] = model.encode(article["encoded_text"]).tolist()
-            # add article to db
-            total_finished += 1
+                {article['lead_paragraph']}
 
-            if total_finished % 100 == 0:
-                print(f"Finished {total_finished} articles of {len(articles)}")
+                {article['snippet']}
 
+                {full_keyword_string}
+                """
+                article["encoded_text"] = full_text
+                article["vector"] = model.encode(article["encoded_text"]).tolist()
+                yield article
+                total_finished += 1
 
+                if total_finished % 100 == 0:
+                    print(f"Finished {total_finished} articles")
 
-        db_utils.write_all_articles(articles)
+        # Vectors stream into the next generation's snapshot; the current store stays in place
+        # until every article is written, so a crash mid-run loses nothing.
+        db_utils.write_all_articles(vectorized_articles())
+        db_utils.close()
 
 if __name__ == "__main__":
     RunVectorization.run_vectorization()
@@ -3,6 +3,7 @@
 import os
 import asyncio
 import re
+import threading
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Tuple
 from datetime import datetime, timedelta, timezone
@@ -34,14 +35,41 @@ NUM_X_POSTS_TO_SELECT = 10
 PERPLEXITY_MODEL = "sonar" # Or your preferred Perplexity model
 GPT_CHAT_MODEL = "gpt-4o" # Or your preferred chat model
 GPT_SEARCH_MODEL = "gpt-4o" # Or your preferred search model
+# How the final articles are picked from the vector search candidates:
+#   "mmr"     - embedding-based maximal marginal relevance only (no LLM round trip)
+#   "gpt"     - GPT picks NUM_FINAL_ARTICLES from NUM_INITIAL_ARTICLES candidates
+#   "mmr+gpt" - MMR narrows MMR_CANDIDATE_POOL candidates to NUM_INITIAL_ARTICLES, then GPT picks
+# Keep "gpt" until vectors.json is re-vectorized with section_name metadata
+ARTICLE_SELECTION_MODE = "gpt"
+MMR_LAMBDA = 0.7 # 1.0 = pure relevance, 0.0 = pure diversity
+MMR_CANDIDATE_POOL = 60
+MAX_ARTICLES_PER_SECTION = 3
+
+INDEX_RELOAD_INTERVAL_SECONDS = 5.0
 
 fetchTooler = FetchUtils()
 
+_shared_vector_search = None
+_shared_vector_search_lock = threading.Lock()
+
+def get_shared_vector_search() -> RunVectorization:
+    """
+    Process-wide RunVectorization. Its index is watched and hot-swapped when the vectorizer
+    republishes the vector store, so long-running API processes pick up new articles without
+    a restart.
+    """
+    global _shared_vector_search
+    with _shared_vector_search_lock:
+        if _shared_vector_search is None:
+            _shared_vector_search = RunVectorization()
+            _shared_vector_search.watch_index(interval=INDEX_RELOAD_INTERVAL_SECONDS)
+    return _shared_vector_search
+
 class NewsOrchestrator:
     def __init__(self):
         print("Initializing Orchestrator...")
         try:
-            self.vector_search = RunVectorization()
+            self.vector_search = get_shared_vector_search()
             self.openai_api = OpenAIAPI()
             self.perplexity_api = PerplexityAPI()
             # Ensure X_USERNAME, X_EMAIL, X_PASSWORD are in your .env file for TwikitAPI
@@ -60,6 +88,10 @@ class NewsOrchestrator:
             raise
 
     async def _filter_articles_by_date(self, articles: List[Dict[str, Any]], days: int = 1) -> List[Dict[str, Any]]:
+        """Filters articles published within the last 'days' on the retrieval pool, off the event loop."""
+        return await self.vector_search.executor.run(self._filter_articles_by_date_sync, articles, days)
+
+    def _filter_articles_by_date_sync(self, articles: List[Dict[str, Any]], days: int = 1) -> List[Dict[str, Any]]:
         """Filters articles published within the last 'days'."""
         filtered_articles = []
         cutoff_date = datetime.now() - timedelta(days=days)
@@ -418,17 +450,30 @@ class NewsOrchestrator:
 
             # Call search_similar with date filters and desired final count for candidates
             # We ask for NUM_INITIAL_ARTICLES directly, assuming the date filter is applied inside.
+            # Encoding and scoring run on the retrieval pool so other coroutines keep running.
 
             AppData.data["emit_function"](AppData.data["socketio"], {"type": "status", "status": "Searching News Index"});
 
             query_text = (topic if focus is None else focus)
 
-            recent_articles = self.vector_search.search_similar_shallow(
-                query_text=query_text,
-                top_k=NUM_INITIAL_ARTICLES, # Request the number needed for diversity selection
-                start_date=start_dt
-                # end_date=end_dt
-            )
+            if ARTICLE_SELECTION_MODE == "gpt":
+                recent_articles = await self.vector_search.asearch_similar_shallow(
+                    query_text,
+                    top_k=NUM_INITIAL_ARTICLES, # Request the number needed for diversity selection
+                    start_date=start_dt
+                    # end_date=end_dt
+                )
+            else:
+                # Diversify on the embeddings directly; in "mmr" mode this is the final selection
+                recent_articles = await self.vector_search.asearch_similar_shallow(
+                    query_text,
+                    top_k=NUM_FINAL_ARTICLES if ARTICLE_SELECTION_MODE == "mmr" else NUM_INITIAL_ARTICLES,
+                    start_date=start_dt,
+                    diversify=True,
+                    mmr_lambda=MMR_LAMBDA,
+                    fetch_k=NUM_INITIAL_ARTICLES if ARTICLE_SELECTION_MODE == "mmr" else MMR_CANDIDATE_POOL,
+                    max_per_section=MAX_ARTICLES_PER_SECTION
+                )
             print(f"Found {len(recent_articles)} relevant articles via vector search within the date range.")
             AppData.data["emit_function"](AppData.data["socketio"], {"type": "status", "status": f"Found {len(recent_articles)} Possible Articles"});
 
@@ -451,7 +496,10 @@ class NewsOrchestrator:
         print(f"\nStep 2: Selecting {NUM_FINAL_ARTICLES} diverse articles from {len(recent_articles)} candidates...")
         AppData.data["emit_function"](AppData.data["socketio"], {"type": "status", "status": f"Personalizing Candidate News"});
         # Pass the already filtered recent_articles list
-        diverse_articles = await self._select_diverse_articles_gpt(recent_articles, topic, focus)
+        if ARTICLE_SELECTION_MODE == "mmr":
+            diverse_articles = recent_articles[:NUM_FINAL_ARTICLES] # Already diversified by MMR
+        else:
+            diverse_articles = await self._select_diverse_articles_gpt(recent_articles, topic, focus)
         if not diverse_articles:
             print("Failed to select diverse articles. Exiting.")
             return []
@@ -1,66 +1,111 @@
-import json
 import os
+import threading
 from datetime import datetime
-from typing import List, Dict, Union
+from typing import List, Dict, Union, Tuple, Optional
+
+from backend.Kernels.archive_reader import iter_docs, project
+from backend.Kernels.article_catalog import ArticleCatalog
+
+# Fields the vectorizers and the orchestrator read; pass as `fields` to skip the rest of each doc
+METADATA_FIELDS = ("_id", "web_url", "headline", "abstract", "lead_paragraph", "snippet", "keywords", "pub_date",
+                   "section_name", "document_type", "multimedia")
+
+# Process-wide cache of parsed months shared by every FetchUtils instance:
+# (file_path, fields) -> ((mtime_ns, size), docs)
+_month_cache: Dict[Tuple[str, Optional[Tuple[str, ...]]], Tuple[Tuple[int, int], List[Dict]]] = {}
+_month_cache_lock = threading.Lock()
+_month_load_locks: Dict[str, threading.Lock] = {}
+
+def clear_month_cache():
+    with _month_cache_lock:
+        _month_cache.clear()
 
 class FetchUtils:
-    def __init__(self):
+    def __init__(self, use_catalog: bool = True):
+        """
+        Args:
+            use_catalog (bool): Serve lookups from the indexed SQLite catalog
+                (backend/News/catalog.sqlite3), importing only monthly files that changed
+                since the last run. With False every call re-reads the JSON files.
+        """
         current_dir = os.path.dirname(os.path.abspath(__file__))
         self.base_path = os.path.join(current_dir, "..", "News", "Metadata")
-        all_data = self._get_all_articles()
-
-        self.data_map = {}
-        for article in all_data:
-            article_url = article.get('web_url')
-            if article_url:
-                self.data_map[article_url] = article
+        self.catalog = None
+        if use_catalog:
+            self.catalog = ArticleCatalog(os.path.join(current_dir, "..", "News", "catalog.sqlite3"))
+            self.catalog.import_directory(self.base_path)
 
-    def get_all_articles_metadata(self, month: int = None, year: int = None) -> List[Dict]:
+    def get_all_articles_metadata(self, month: int = None, year: int = None, fields: Tuple[str, ...] = None) -> List[Dict]:
         """
-        Fetch article metadata either for a specific month/year or all available articles
+        Fetch article metadata either for a specific month/year or all available articles.
+        Parsed months are cached process-wide and only re-read when their file changes;
+        the returned docs are shared between callers and must not be modified.
         
         Args:
             month (int, optional): Month (1-12)
             year (int, optional): Year (YYYY)
+            fields (Tuple[str, ...], optional): Keep only these doc fields (e.g. METADATA_FIELDS)
             
         Returns:
             List[Dict]: List of article metadata dictionaries
         """
+        if self.catalog is not None:
+            # Picks up monthly files rewritten since the last import; a stat per file otherwise
+            self.catalog.import_directory(self.base_path)
         if month and year:
-            return self._get_specific_month_articles(month, year)
-        return self._get_all_articles()
+            return self._get_specific_month_articles(month, year, fields)
+        return self._get_all_articles(fields)
 
-    def _get_specific_month_articles(self, month: int, year: int) -> List[Dict]:
+    def _get_specific_month_articles(self, month: int, year: int, fields: Tuple[str, ...] = None) -> List[Dict]:
         """Get articles for a specific month and year"""
         filename = f"nytimes_{year}_{month:02d}.json"
         file_path = os.path.join(self.base_path, filename)
         
         if not os.path.exists(file_path):
             return []
-            
+
+        return list(self._load_month(file_path, month, year, tuple(fields) if fields else None))
+
+    def _load_month(self, file_path: str, month: int, year: int, fields: Optional[Tuple[str, ...]]) -> List[Dict]:
+        """Parsed docs of one monthly file, from the process-wide cache unless the file's (mtime, size) changed."""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get('response', {}).get('docs', [])
-        except Exception as e:
-            print(f"Error reading file {filename}: {str(e)}")
+            stat = os.stat(file_path)
+        except FileNotFoundError:
             return []
+        signature = (stat.st_mtime_ns, stat.st_size)
+        key = (os.path.abspath(file_path), fields)
+        cached = _month_cache.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        with _month_cache_lock:
+            load_lock = _month_load_locks.setdefault(key[0], threading.Lock())
+        with load_lock:
+            # Another thread may have parsed it while we waited
+            cached = _month_cache.get(key)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+            try:
+                if self.catalog is not None:
+                    docs = [project(doc, fields) for doc in self.catalog.get_month(year, month)]
+                else:
+                    # Streams response.docs so only the projected fields of each doc are kept
+                    docs = list(iter_docs(file_path, fields=fields))
+            except Exception as e:
+                print(f"Error reading file {os.path.basename(file_path)}: {str(e)}")
+                return []
+            with _month_cache_lock:
+                _month_cache[key] = (signature, docs)
+            return docs
 
-    def _get_all_articles(self) -> List[Dict]:
+    def _get_all_articles(self, fields: Tuple[str, ...] = None) -> List[Dict]:
         """Get all articles from all available files"""
         all_articles = []
         
-        for filename in os.listdir(self.base_path):
-            if filename.startswith("nytimes_") and filename.endswith(".json"):
-                file_path = os.path.join(self.base_path, filename)
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        articles = data.get('response', {}).get('docs', [])
-                        all_articles.extend(articles)
-                except Exception as e:
-                    print(f"Error reading file {filename}: {str(e)}")
-                    continue
+        for date in self.get_available_months():
+            file_path = os.path.join(self.base_path, f"nytimes_{date['year']}_{date['month']:02d}.json")
+            all_articles.extend(self._load_month(file_path, date['month'], date['year'],
+                                                 tuple(fields) if fields else None))
         
         return all_articles
     def get_available_months(self) -> List[Dict[str, int]]:
@@ -85,5 +130,10 @@ class FetchUtils:
         return sorted(available_dates, key=lambda x: (x["year"], x["month"]))
     
     def get_full_article_data(self, article_url: str):
-        return self.data_map.get(article_url, None)
+        if self.catalog is not None:
+            return self.catalog.get_by_url(article_url)
+        for article in self._get_all_articles():
+            if article.get('web_url') == article_url:
+                return article
+        return None
 
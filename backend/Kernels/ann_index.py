@@ -0,0 +1,274 @@
+import os
+import numpy as np
+from typing import List, Tuple, Optional
+
+from backend.Kernels.vector_index import normalize_rows
+
+
+class IVFIndex:
+    """
+    Inverted-file (IVF) approximate nearest-neighbour index over article vectors.
+
+    Vectors are L2-normalized and assigned to the closest of `nlist` spherical k-means
+    centroids. A query scores the centroids, then only the vectors in the `nprobe` best
+    lists, so query cost grows with N / nlist * nprobe instead of N. Raising nprobe trades
+    latency for recall.
+
+    Until `min_train_size` vectors have been added the index stays flat (exact search);
+    it trains itself the first time that size is reached. Vectors added after training
+    are assigned to the existing centroids; call rebuild() once the corpus has grown well
+    past the size it was trained on.
+    """
+
+    def __init__(self, nlist: Optional[int] = None, nprobe: int = 8, min_train_size: int = 4096,
+                 kmeans_iters: int = 20, seed: int = 0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.kmeans_iters = kmeans_iters
+        self.seed = seed
+
+        self.centroids = None
+        self.trained_size = 0
+        self.keys: List[str] = []
+        self._key_to_id = {}
+        self._deleted = set()
+        self._pub_ts: List[int] = []
+        self._pub_ts_cache = None
+        # Per-list storage; new vectors land in the pending chunks until the next search.
+        self._list_vectors: List[np.ndarray] = []
+        self._list_ids: List[np.ndarray] = []
+        self._pending: List[List[Tuple[np.ndarray, np.ndarray]]] = []
+        self._reset_lists(1)
+
+    def __len__(self) -> int:
+        return len(self.keys) - len(self._deleted)
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def _reset_lists(self, num_lists: int):
+        self._list_vectors = [np.zeros((0, 0), dtype=np.float32) for _ in range(num_lists)]
+        self._list_ids = [np.zeros(0, dtype=np.int64) for _ in range(num_lists)]
+        self._pending = [[] for _ in range(num_lists)]
+
+    def _consolidate(self):
+        for i, pending in enumerate(self._pending):
+            if not pending:
+                continue
+            vectors = [v for v, _ in pending]
+            ids = [ids for _, ids in pending]
+            if self._list_vectors[i].size:
+                vectors.insert(0, self._list_vectors[i])
+                ids.insert(0, self._list_ids[i])
+            self._list_vectors[i] = np.concatenate(vectors)
+            self._list_ids[i] = np.concatenate(ids)
+            self._pending[i] = []
+
+    def _all_vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return every stored vector and its id, ordered by id."""
+        self._consolidate()
+        parts = [(v, ids) for v, ids in zip(self._list_vectors, self._list_ids) if ids.size]
+        if not parts:
+            return np.zeros((0, 0), dtype=np.float32), np.zeros(0, dtype=np.int64)
+        vectors = np.concatenate([v for v, _ in parts])
+        ids = np.concatenate([ids for _, ids in parts])
+        order = np.argsort(ids, kind="stable")
+        return vectors[order], ids[order]
+
+    def _assign(self, vectors: np.ndarray, batch_size: int = 8192) -> np.ndarray:
+        assignments = np.empty(vectors.shape[0], dtype=np.int64)
+        for start in range(0, vectors.shape[0], batch_size):
+            batch = vectors[start:start + batch_size]
+            assignments[start:start + batch_size] = np.argmax(batch @ self.centroids.T, axis=1)
+        return assignments
+
+    def _kmeans(self, vectors: np.ndarray, nlist: int) -> np.ndarray:
+        rng = np.random.default_rng(self.seed)
+        centroids = vectors[rng.choice(vectors.shape[0], nlist, replace=False)].copy()
+        for _ in range(self.kmeans_iters):
+            self.centroids = centroids
+            assignments = self._assign(vectors)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, vectors)
+            counts = np.bincount(assignments, minlength=nlist)
+            empty = counts == 0
+            if empty.any():
+                # Re-seed empty lists from random vectors so every list stays useful.
+                sums[empty] = vectors[rng.choice(vectors.shape[0], int(empty.sum()), replace=False)]
+            centroids = normalize_rows(sums.astype(np.float32))
+        return centroids
+
+    def train(self):
+        """(Re)train the coarse quantizer on every stored vector and redistribute the lists."""
+        vectors, ids = self._all_vectors()
+        if vectors.shape[0] == 0:
+            return
+        nlist = self.nlist or max(1, int(4 * np.sqrt(vectors.shape[0])))
+        nlist = min(nlist, vectors.shape[0])
+        self.centroids = self._kmeans(vectors, nlist)
+        self.trained_size = vectors.shape[0]
+        self._reset_lists(nlist)
+        self._distribute(vectors, ids)
+
+    def rebuild(self):
+        """Retrain on the current corpus (e.g. after a few months of incremental inserts)."""
+        self.train()
+
+    def _distribute(self, vectors: np.ndarray, ids: np.ndarray):
+        if self.is_trained:
+            assignments = self._assign(vectors)
+            for list_id in np.unique(assignments):
+                members = assignments == list_id
+                self._pending[list_id].append((vectors[members], ids[members]))
+        else:
+            self._pending[0].append((vectors, ids))
+
+    def add(self, keys: List[str], vectors, pub_ts: List[int], replace: bool = False):
+        """
+        Insert vectors keyed by URL. Keys that are already indexed are ignored unless
+        replace=True, in which case the old entry is tombstoned and the new vector added.
+
+        Args:
+            keys (List[str]): Article URLs.
+            vectors: Array-like of shape (n, dim).
+            pub_ts (List[int]): Publication dates as UTC epoch seconds.
+            replace (bool): Overwrite entries whose key is already indexed.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        keep = []
+        for i, key in enumerate(keys):
+            if key in self._key_to_id:
+                if not replace:
+                    continue
+                self._deleted.add(self._key_to_id[key])
+            self._key_to_id[key] = len(self.keys) + len(keep)
+            keep.append(i)
+        if not keep:
+            return
+
+        vectors = normalize_rows(vectors[keep].copy())
+        ids = np.arange(len(self.keys), len(self.keys) + len(keep), dtype=np.int64)
+        self.keys.extend(keys[i] for i in keep)
+        self._pub_ts.extend(int(pub_ts[i]) for i in keep)
+        self._distribute(vectors, ids)
+
+        if not self.is_trained and len(self) >= self.min_train_size:
+            self.train()
+
+    def _pub_ts_array(self) -> np.ndarray:
+        if self._pub_ts_cache is None or self._pub_ts_cache.size != len(self._pub_ts):
+            self._pub_ts_cache = np.asarray(self._pub_ts, dtype=np.int64)
+        return self._pub_ts_cache
+
+    def search(self, query_vector, top_k: int = 5, nprobe: Optional[int] = None,
+               start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Approximate top_k search within an optional pub_date window.
+
+        Returns:
+            List[Tuple[str, float]]: (url, cosine similarity) pairs, best match first.
+        """
+        if len(self) == 0 or top_k <= 0:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32).ravel()
+        query_norm = np.linalg.norm(query)
+        if query_norm == 0:
+            return []
+        query = query / query_norm
+
+        self._consolidate()
+        if self.is_trained:
+            nprobe = min(nprobe or self.nprobe, self.centroids.shape[0])
+            order = np.argsort(-(self.centroids @ query), kind="stable")
+        else:
+            nprobe = 1
+            order = [0]
+
+        windowed = start_ts is not None or end_ts is not None
+        if windowed:
+            pub_ts = self._pub_ts_array()
+            in_window = np.ones(pub_ts.size, dtype=bool)
+            if start_ts is not None:
+                in_window &= pub_ts >= start_ts
+            if end_ts is not None:
+                in_window &= pub_ts <= end_ts
+        else:
+            in_window = None
+        if self._deleted:
+            live = np.ones(len(self.keys), dtype=bool)
+            live[np.fromiter(self._deleted, dtype=np.int64)] = False
+            in_window = live if in_window is None else in_window & live
+
+        # Probe lists best centroid first. Rows outside the window are dropped before scoring,
+        # and nprobe is scaled by 1 / (fraction of rows in the window) so a windowed query
+        # scores about as many rows as an unwindowed one. A window small enough to fit in
+        # that budget is therefore searched exactly. Probing also continues until top_k
+        # in-window hits are found.
+        if windowed:
+            window_size = int(in_window.sum())
+            if window_size == 0:
+                return []
+            nprobe = min(len(order), int(np.ceil(nprobe * len(self) / window_size)))
+        id_parts, score_parts = [], []
+        hits = 0
+        for probed, list_id in enumerate(order):
+            if probed >= nprobe and (not windowed or hits >= top_k):
+                break
+            list_ids = self._list_ids[list_id]
+            if not list_ids.size:
+                continue
+            vectors = self._list_vectors[list_id]
+            if in_window is not None:
+                keep = in_window[list_ids]
+                if not keep.any():
+                    continue
+                list_ids, vectors = list_ids[keep], vectors[keep]
+            id_parts.append(list_ids)
+            score_parts.append(vectors @ query)
+            hits += list_ids.size
+        if not id_parts:
+            return []
+        ids = np.concatenate(id_parts)
+        scores = np.concatenate(score_parts)
+
+        k = min(top_k, ids.size)
+        top = np.argpartition(-scores, k - 1)[:k] if k < ids.size else np.arange(ids.size)
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.keys[ids[i]], float(scores[i])) for i in top]
+
+    def save(self, path: str):
+        """Persist the index to an .npz file (written to a temp file, then renamed)."""
+        vectors, ids = self._all_vectors()
+        live = ~np.isin(ids, np.fromiter(self._deleted, dtype=np.int64))
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            vectors=vectors[live],
+            keys=np.asarray(self.keys, dtype=str)[live],
+            pub_ts=np.asarray(self._pub_ts, dtype=np.int64)[live],
+            centroids=self.centroids if self.is_trained else np.zeros((0, 0), dtype=np.float32),
+            params=np.asarray([self.nlist or 0, self.nprobe, self.min_train_size, self.trained_size], dtype=np.int64),
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "IVFIndex":
+        with np.load(path, allow_pickle=False) as data:
+            nlist, nprobe, min_train_size, trained_size = (int(x) for x in data["params"])
+            index = cls(nlist=nlist or None, nprobe=nprobe, min_train_size=min_train_size)
+            keys = data["keys"].tolist()
+            vectors = data["vectors"]
+            index.keys = keys
+            index._key_to_id = {key: i for i, key in enumerate(keys)}
+            index._pub_ts = data["pub_ts"].tolist()
+            if data["centroids"].size:
+                index.centroids = data["centroids"]
+                index.trained_size = trained_size
+                index._reset_lists(index.centroids.shape[0])
+            if vectors.size:
+                index._distribute(vectors, np.arange(len(keys), dtype=np.int64))
+        return index
@@ -0,0 +1,134 @@
+"""
+Streaming reader for NYT archive files and other JSON files holding one large array.
+
+iter_docs() yields the items of the array at `path` (response.docs for NYT archive
+files, data for DBUtils files, () for a top-level array) one at a time, so memory stays
+flat regardless of the file size. It uses ijson when it is installed and otherwise falls back to walking the
+path with a chunked json.JSONDecoder.raw_decode scan.
+"""
+
+import json
+from typing import Dict, Any, Iterator, Optional, Sequence, Tuple
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+ARCHIVE_DOCS_PATH = ("response", "docs")
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+def project(doc: Dict[str, Any], fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+    """Keep only `fields` of doc (all of it when fields is None)."""
+    if fields is None:
+        return doc
+    return {field: doc[field] for field in fields if field in doc}
+
+
+def iter_docs(file_path: str, path: Sequence[str] = ARCHIVE_DOCS_PATH, fields: Optional[Sequence[str]] = None,
+              chunk_size: int = 1 << 20) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the items of the JSON array at `path` in file_path one at a time.
+
+    Args:
+        file_path (str): JSON file, e.g. backend/News/Metadata/nytimes_2025_04.json.
+        path (Sequence[str]): Keys leading to the array; ("response", "docs") for NYT archives,
+            () when the file itself is the array.
+        fields (Sequence[str], optional): Keep only these keys of each item.
+        chunk_size (int): Characters read per step by the fallback parser.
+    """
+    if ijson is not None:
+        with open(file_path, "rb") as f:
+            for doc in ijson.items(f, ".".join(tuple(path) + ("item",)), use_float=True):
+                yield project(doc, fields)
+        return
+    for doc in _iter_docs_fallback(file_path, tuple(path), chunk_size):
+        yield project(doc, fields)
+
+
+class _ChunkedBuffer:
+    """Text read from f in chunks, with a cursor; consumed text is dropped as the cursor moves on."""
+
+    def __init__(self, f, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.text = self.text[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self, skip: str = "") -> Optional[str]:
+        """Next character after whitespace (and any characters in skip), or None at end of file."""
+        while True:
+            while self.pos < len(self.text) and (self.text[self.pos] in _WHITESPACE or self.text[self.pos] in skip):
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self._fill():
+                return None
+
+    def advance(self):
+        self.pos += 1
+
+    def decode(self) -> Any:
+        """Decode the JSON value at the cursor, reading more of the file while it is cut off."""
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except ValueError:
+                if not self._fill():
+                    raise ValueError(f"Truncated JSON in {self.f.name}")
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self.text) and not self.eof and not isinstance(value, (dict, list, str)):
+                if self._fill():
+                    continue
+            self.pos = end
+            if self.pos > self.chunk_size:
+                self.text = self.text[self.pos:]
+                self.pos = 0
+            return value
+
+
+def _iter_docs_fallback(file_path: str, path: Tuple[str, ...], chunk_size: int) -> Iterator[Dict[str, Any]]:
+    # Walks the objects along path key by key, decoding (and discarding) sibling values on the
+    # way, then raw_decodes the array items one at a time.
+    with open(file_path, "r", encoding="utf-8") as f:
+        buffer = _ChunkedBuffer(f, chunk_size)
+        for key in path:
+            if buffer.peek() != "{":
+                return
+            buffer.advance()
+            while True:
+                char = buffer.peek(",")
+                if char is None or char == "}":
+                    return
+                name = buffer.decode()
+                if buffer.peek() != ":":
+                    raise ValueError(f"Malformed JSON object in {file_path}")
+                buffer.advance()
+                buffer.peek()
+                if name == key:
+                    break
+                buffer.decode()
+        if buffer.peek() != "[":
+            return
+        buffer.advance()
+        while True:
+            char = buffer.peek(",")
+            if char is None or char == "]":
+                return
+            yield buffer.decode()
@@ -0,0 +1,204 @@
+"""
+Indexed local catalog of NYT archive articles, backed by SQLite.
+
+Each nytimes_YYYY_MM.json file under backend/News/Metadata is imported once into
+backend/News/catalog.sqlite3. The database has one row per doc (the full doc as JSON plus
+indexed web_url, _id, pub_date and section_name columns) and records the (mtime, size)
+of every imported file. Later imports stat the files and only re-import the months
+that changed.
+
+    python -m backend.Kernels.article_catalog [metadata_dir] [--force]
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import threading
+from typing import List, Dict, Any, Iterator, Optional
+
+from backend.Kernels.archive_reader import iter_docs
+from backend.Kernels.vector_index import parse_pub_date
+
+# Bumped whenever the tables change; older catalogs are dropped and re-imported
+SCHEMA_VERSION = 2
+
+# Rows are keyed by their position in the month file, so every doc of every file is kept
+# even when the same _id appears in several months (as the JSON files themselves do)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    _id TEXT,
+    web_url TEXT,
+    pub_date TEXT,
+    pub_ts INTEGER,
+    section_name TEXT,
+    document_type TEXT,
+    doc TEXT NOT NULL,
+    PRIMARY KEY (year, month, position)
+);
+CREATE INDEX IF NOT EXISTS idx_articles_id ON articles (_id);
+CREATE INDEX IF NOT EXISTS idx_articles_web_url ON articles (web_url);
+CREATE INDEX IF NOT EXISTS idx_articles_pub_ts ON articles (pub_ts);
+CREATE INDEX IF NOT EXISTS idx_articles_section ON articles (section_name);
+CREATE TABLE IF NOT EXISTS sources (
+    filename TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    doc_count INTEGER NOT NULL
+);
+"""
+
+
+def month_from_filename(filename: str) -> Optional[tuple]:
+    """(year, month) of an archive file name such as nytimes_2025_04.json, or None."""
+    if not (filename.startswith("nytimes_") and filename.endswith(".json")):
+        return None
+    try:
+        year, month = map(int, filename[len("nytimes_"):-len(".json")].split("_"))
+    except ValueError:
+        return None
+    return year, month
+
+
+class ArticleCatalog:
+    """
+    SQLite catalog of archive docs. Safe to share between threads: each thread gets its
+    own connection, and writes are serialized.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connection() as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                conn.executescript("DROP TABLE IF EXISTS articles; DROP TABLE IF EXISTS sources;")
+            conn.executescript(SCHEMA)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        return [json.loads(row[0]) for row in self._connection().execute(sql, params)]
+
+    def needs_import(self, file_path: str) -> bool:
+        stat = os.stat(file_path)
+        row = self._connection().execute(
+            "SELECT mtime_ns, size FROM sources WHERE filename = ?", (os.path.basename(file_path),)
+        ).fetchone()
+        return row is None or row != (stat.st_mtime_ns, stat.st_size)
+
+    def import_month_file(self, file_path: str, docs: Iterator[Dict[str, Any]] = None) -> int:
+        """
+        Replace the catalog rows of one monthly archive file with its docs in one transaction.
+        docs defaults to the file's response.docs, streamed so the whole file is never held in memory.
+        """
+        filename = os.path.basename(file_path)
+        year, month = month_from_filename(filename)
+        stat = os.stat(file_path)
+        if docs is None:
+            docs = iter_docs(file_path)
+        count = 0
+
+        def rows():
+            nonlocal count
+            for position, doc in enumerate(docs):
+                count += 1
+                yield (
+                    year,
+                    month,
+                    position,
+                    doc.get("_id"),
+                    doc.get("web_url"),
+                    doc.get("pub_date"),
+                    parse_pub_date(doc.get("pub_date")),
+                    doc.get("section_name"),
+                    doc.get("document_type"),
+                    json.dumps(doc),
+                )
+
+        with self._write_lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM articles WHERE year = ? AND month = ?", (year, month))
+                conn.executemany("INSERT INTO articles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows())
+                conn.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?)",
+                             (filename, stat.st_mtime_ns, stat.st_size, count))
+        return count
+
+    def import_directory(self, base_path: str, force: bool = False) -> Dict[str, int]:
+        """
+        Import every nytimes_YYYY_MM.json under base_path that is new or changed since its
+        last import (all of them with force=True). Returns {filename: docs imported}.
+        """
+        imported = {}
+        if not os.path.isdir(base_path):
+            return imported
+        for filename in sorted(os.listdir(base_path)):
+            if month_from_filename(filename) is None:
+                continue
+            file_path = os.path.join(base_path, filename)
+            if not force and not self.needs_import(file_path):
+                continue
+            try:
+                imported[filename] = self.import_month_file(file_path)
+                print(f"Imported {imported[filename]} articles from {filename} into the catalog")
+            except Exception as e:
+                print(f"Error importing file {filename}: {str(e)}")
+        return imported
+
+    def get_by_url(self, web_url: str) -> Optional[Dict[str, Any]]:
+        docs = self._query("SELECT doc FROM articles WHERE web_url = ? ORDER BY pub_ts DESC LIMIT 1", (web_url,))
+        return docs[0] if docs else None
+
+    def get_by_id(self, article_id: str) -> Optional[Dict[str, Any]]:
+        docs = self._query("SELECT doc FROM articles WHERE _id = ? ORDER BY pub_ts DESC LIMIT 1", (article_id,))
+        return docs[0] if docs else None
+
+    def get_month(self, year: int, month: int) -> List[Dict[str, Any]]:
+        return self._query("SELECT doc FROM articles WHERE year = ? AND month = ? ORDER BY position", (year, month))
+
+    def get_all(self) -> List[Dict[str, Any]]:
+        return self._query("SELECT doc FROM articles ORDER BY year, month, position")
+
+    def get_range(self, start_ts: int = None, end_ts: int = None, section_name: str = None) -> List[Dict[str, Any]]:
+        """Docs published in [start_ts, end_ts] (epoch seconds), optionally in one section, oldest first."""
+        clauses, params = [], []
+        if start_ts is not None:
+            clauses.append("pub_ts >= ?")
+            params.append(start_ts)
+        if end_ts is not None:
+            clauses.append("pub_ts <= ?")
+            params.append(end_ts)
+        if section_name is not None:
+            clauses.append("section_name = ?")
+            params.append(section_name)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self._query(f"SELECT doc FROM articles {where} ORDER BY pub_ts", tuple(params))
+
+    def available_months(self) -> List[Dict[str, int]]:
+        rows = self._connection().execute("SELECT DISTINCT year, month FROM articles ORDER BY year, month")
+        return [{"year": year, "month": month} for year, month in rows]
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+
+if __name__ == "__main__":
+    # python -m backend.Kernels.article_catalog [metadata_dir] [--force]
+    args = [arg for arg in sys.argv[1:] if arg != "--force"]
+    metadata_dir = args[0] if args else os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "News", "Metadata")
+    catalog = ArticleCatalog(os.path.join(metadata_dir, "..", "catalog.sqlite3"))
+    imported = catalog.import_directory(metadata_dir, force="--force" in sys.argv)
+    print(f"Imported {sum(imported.values())} articles from {len(imported)} files; catalog holds {catalog.count()}")
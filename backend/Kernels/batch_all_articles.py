@@ -58,10 +58,10 @@ class OndemandPull():
         db_utils_skip = DBUtils(db_skip_file)
 
         # get finished articles
-        finished_urls = await self.get_finished_urls()
+        finished_urls = set(await self.get_finished_urls())
 
         # get skipped urls
-        skipped_urls = await self.get_skipped()
+        skipped_urls = set(await self.get_skipped())
 
         print(f"All finished or skipped articles: {len(finished_urls) + len(skipped_urls)}")
 
@@ -70,7 +70,7 @@ class OndemandPull():
 
         print(f"Remaining unfinished articles: {len(unfinished_urls)}")
 
-        finished_articles = await self.get_finish_urls_data()
+        num_finished, num_skipped = len(finished_urls), len(skipped_urls)
 
         # Batch the URLs
         for i in range(0, len(unfinished_urls), batch_size):
@@ -81,20 +81,26 @@ class OndemandPull():
 
             if "RATE_LIMITED" in results:
                 # exit python
+                db_utils.close()
+                db_utils_skip.close()
                 exit(1)
             
             for (id, url), content in zip(batch, results):
+                # append only the new record to the db log
                 if content is not None:
-                    finished_articles.append({
+                    db_utils.put_article({
                         "_id": id,
                         "content": content
                     })
-                    db_utils.write_all_articles(finished_articles)
+                    num_finished += 1
                 else:
-                    skipped_urls.append(url)
-                    db_utils_skip.write_all_articles(skipped_urls)
+                    db_utils_skip.put_article(url)
+                    num_skipped += 1
                 
-                print(f"Finished {len(finished_articles) + len(skipped_urls)} articles out of {len_total}: {(len(finished_articles) + len(skipped_urls)) / len_total * 100:.2f}%")
+                print(f"Finished {num_finished + num_skipped} articles out of {len_total}: {(num_finished + num_skipped) / len_total * 100:.2f}%")
+
+        db_utils.close()
+        db_utils_skip.close()
 if __name__ == "__main__":
     asyncio.run(OndemandPull().continue_fetch())
 
@@ -0,0 +1,274 @@
+"""
+Binary on-disk layout for the shallow vector store, written next to vectors.json.
+
+For a base path such as backend/News/vectors, each write publishes a new generation directory
+and then flips the manifest that points at it:
+    vectors.manifest.json           {"generation", "dir", "rows", "dim", "quantization"}; replaced last
+    vectors.gen_00000003/
+        vectors.npy                 float32 (n, dim) matrix, L2-normalized, rows sorted by pub_date
+        pub_ts.npy                  int64 (n,) pub_date epoch per row
+        offsets.npy                 int64 (n + 1,) byte offsets of each row's line in meta.jsonl
+        meta.jsonl                  one JSON record per row (web_url, metadata, content_hash; no vector)
+        codes.npy                   int8 / uint8 quantized rows, when written with quantization
+        quantizer.npz               the trained scales or PQ codebooks for codes.npy
+
+Readers resolve the manifest once and open every file from the same generation, so they never
+see a mix of old and new files; the previous generation is kept for readers that are still
+opening it. Stores written before generations existed (vectors.npy, vectors.pub_ts.npy, ...
+next to the base path) are still loaded.
+
+The matrix is opened with np.load(mmap_mode='r'), so opening is near-instant and worker
+processes share the same page-cache pages. Metadata lines are decoded only for result rows.
+Quantized codes are memory-mapped the same way, so a quantized store opens without retraining.
+"""
+
+import os
+import re
+import sys
+import json
+import mmap
+import shutil
+import numpy as np
+from typing import List, Dict, Any, Optional
+
+from backend.Kernels.vector_index import VectorIndex, parse_pub_date, normalize_rows
+from backend.Kernels.quantization import build_quantizer, load_quantizer, save_quantizer
+
+_GENERATION_DIR = re.compile(r"\.gen_(\d+)$")
+
+
+def manifest_path(base_path: str) -> str:
+    return f"{base_path}.manifest.json"
+
+
+def read_manifest(base_path: str) -> Optional[Dict[str, Any]]:
+    """The published manifest of the store at base_path, or None when there is none."""
+    try:
+        with open(manifest_path(base_path), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _generation_dir(base_path: str, generation: int) -> str:
+    return f"{base_path}.gen_{generation:08d}"
+
+
+def _generation_paths(directory: str) -> Dict[str, str]:
+    return {
+        "vectors": os.path.join(directory, "vectors.npy"),
+        "pub_ts": os.path.join(directory, "pub_ts.npy"),
+        "offsets": os.path.join(directory, "offsets.npy"),
+        "meta": os.path.join(directory, "meta.jsonl"),
+    }
+
+
+def _code_paths(directory: str) -> Dict[str, str]:
+    return {
+        "codes": os.path.join(directory, "codes.npy"),
+        "quantizer": os.path.join(directory, "quantizer.npz"),
+    }
+
+
+def _legacy_paths(base_path: str) -> Dict[str, str]:
+    return {
+        "vectors": f"{base_path}.npy",
+        "pub_ts": f"{base_path}.pub_ts.npy",
+        "offsets": f"{base_path}.offsets.npy",
+        "meta": f"{base_path}.meta.jsonl",
+    }
+
+
+def binary_store_paths(base_path: str, manifest: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+    """Files of the generation `manifest` points at (the published one by default), or of a pre-generation store."""
+    manifest = manifest or read_manifest(base_path)
+    if manifest is None:
+        return _legacy_paths(base_path)
+    return _generation_paths(os.path.join(os.path.dirname(os.path.abspath(base_path)), manifest["dir"]))
+
+
+def binary_store_exists(base_path: str) -> bool:
+    return all(os.path.exists(path) for path in binary_store_paths(base_path).values())
+
+
+def _generation_dirs(base_path: str) -> Dict[int, str]:
+    directory = os.path.dirname(os.path.abspath(base_path))
+    prefix = os.path.basename(base_path)
+    found = {}
+    for name in os.listdir(directory):
+        match = _GENERATION_DIR.search(name)
+        if match and name[:match.start()] == prefix:
+            found[int(match.group(1))] = os.path.join(directory, name)
+    return found
+
+
+def remove_binary_store(base_path: str):
+    """Delete the manifest, every generation directory and any pre-generation files."""
+    for path in [manifest_path(base_path)] + list(_legacy_paths(base_path).values()):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    for directory in _generation_dirs(base_path).values():
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+class MetadataSidecar:
+    """Read-only, memory-mapped view of vectors.meta.jsonl; decodes one record per lookup."""
+
+    def __init__(self, path: str, offsets: np.ndarray):
+        self.path = path
+        self.offsets = offsets
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row: int) -> Dict[str, Any]:
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return json.loads(self._mmap[start:end])
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    def close(self):
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+        self._file.close()
+
+
+def _save_array(path: str, array: np.ndarray):
+    # np.save appends .npy to names without it, so write through a file object
+    with open(path, "wb") as f:
+        np.save(f, array)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def write_binary_store(records: List[Dict[str, Any]], base_path: str, quantization: str = None):
+    """
+    Write records in the run_vectorization_shallow format to a new generation of the binary
+    layout and publish it by replacing the manifest.
+    Records without a vector or a parseable pub_date are skipped, as in VectorIndex.
+
+    Args:
+        records (List[Dict[str, Any]]): Records with web_url, vector and metadata.
+        base_path (str): Store path without extension, e.g. backend/News/vectors.
+        quantization (str, optional): 'int8' or 'pq'; trains the quantizer once and stores
+            its codes in the generation so load_binary_index can map them.
+    """
+    rows = []
+    for item in records:
+        ts = parse_pub_date(item.get("metadata", {}).get("pub_date"))
+        if item.get("vector") is None or ts is None:
+            continue
+        rows.append((ts, item))
+    rows.sort(key=lambda row: row[0])
+
+    existing = _generation_dirs(base_path)
+    manifest = read_manifest(base_path)
+    generation = max([manifest["generation"] if manifest else 0] + list(existing)) + 1
+    directory = _generation_dir(base_path, generation)
+    os.makedirs(directory)
+    paths = _generation_paths(directory)
+
+    offsets = [0]
+    with open(paths["meta"], "wb") as f:
+        for _, item in rows:
+            line = json.dumps({k: v for k, v in item.items() if k != "vector"}).encode("utf-8") + b"\n"
+            f.write(line)
+            offsets.append(offsets[-1] + len(line))
+        f.flush()
+        os.fsync(f.fileno())
+
+    if rows:
+        vectors = normalize_rows(np.asarray([item["vector"] for _, item in rows], dtype=np.float32))
+    else:
+        vectors = np.zeros((0, 0), dtype=np.float32)
+    _save_array(paths["vectors"], vectors)
+    _save_array(paths["pub_ts"], np.asarray([ts for ts, _ in rows], dtype=np.int64))
+    _save_array(paths["offsets"], np.asarray(offsets, dtype=np.int64))
+    if quantization and rows:
+        quantizer = build_quantizer(quantization).train(vectors)
+        code_paths = _code_paths(directory)
+        _save_array(code_paths["codes"], quantizer.encode(vectors))
+        with open(code_paths["quantizer"], "wb") as f:
+            save_quantizer(quantizer, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+    # The manifest flip is the single publish step; everything it points at is already durable.
+    manifest = {"generation": generation, "dir": os.path.basename(directory), "rows": len(rows),
+                "dim": int(vectors.shape[1]), "quantization": quantization if rows else None}
+    tmp_path = f"{manifest_path(base_path)}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, manifest_path(base_path))
+
+    # Keep the previous generation for readers that resolved the old manifest a moment ago.
+    for old_generation, old_directory in existing.items():
+        if old_generation < generation - 1:
+            shutil.rmtree(old_directory, ignore_errors=True)
+    for path in _legacy_paths(base_path).values():
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def load_binary_index(base_path: str, quantization: str = None) -> VectorIndex:
+    """
+    Open a binary store as a VectorIndex backed by memory-mapped arrays. With quantization
+    ('int8' or 'pq') searches score the compressed codes and the float32 matrix stays on disk
+    for rescoring. Codes stored with the generation are memory-mapped; stores written without
+    them (or with another mode) are quantized on load.
+
+    Raises:
+        ValueError: If the vectors, pub_ts and offsets files disagree on the number of rows.
+    """
+    # One manifest read, so every file comes from the same generation
+    manifest = read_manifest(base_path)
+    paths = binary_store_paths(base_path, manifest)
+    vectors = np.load(paths["vectors"], mmap_mode="r")
+    pub_ts = np.load(paths["pub_ts"], mmap_mode="r")
+    offsets = np.load(paths["offsets"])
+    rows = vectors.shape[0]
+    if pub_ts.shape[0] != rows or offsets.shape[0] != rows + 1 or (manifest and manifest["rows"] != rows):
+        raise ValueError(f"Inconsistent binary store at {base_path}: {rows} vectors, {pub_ts.shape[0]} pub_ts, "
+                         f"{offsets.shape[0] - 1} offsets" + (f", manifest {manifest['rows']}" if manifest else ""))
+    sidecar = MetadataSidecar(paths["meta"], offsets)
+    index = VectorIndex(
+        vectors=vectors,
+        pub_ts=pub_ts,
+        urls=None,
+        offsets=np.arange(len(sidecar), dtype=np.int64),
+        records=sidecar,
+    )
+    if not quantization:
+        return index
+    code_paths = _code_paths(os.path.dirname(paths["vectors"]))
+    if manifest and manifest.get("quantization") == quantization and os.path.exists(code_paths["quantizer"]):
+        codes = np.load(code_paths["codes"], mmap_mode="r")
+        if codes.shape[0] != rows:
+            raise ValueError(f"Inconsistent binary store at {base_path}: {rows} vectors, {codes.shape[0]} codes")
+        index.quantizer = load_quantizer(code_paths["quantizer"])
+        index.codes = codes
+    else:
+        print(f"No stored {quantization} codes for {base_path}, quantizing on load")
+        index.quantize(quantization)
+    return index
+
+
+if __name__ == "__main__":
+    # Convert an existing vectors.json, optionally storing int8 or pq codes:
+    #   python -m backend.Kernels.binary_vector_store backend/News/vectors.json [int8|pq]
+    json_path = sys.argv[1] if len(sys.argv) > 1 else "backend/News/vectors.json"
+    with open(json_path, "r") as f:
+        data = json.load(f)
+    write_binary_store(data, os.path.splitext(json_path)[0], quantization=sys.argv[2] if len(sys.argv) > 2 else None)
+    print(f"Wrote binary vector store for {len(data)} records next to {json_path}")
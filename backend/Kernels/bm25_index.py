@@ -0,0 +1,211 @@
+import os
+import re
+import math
+import pickle
+import numpy as np
+from collections import Counter
+from typing import Dict, List, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:['.&-][a-z0-9]+)*")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "has", "have", "he",
+    "her", "his", "in", "is", "it", "its", "of", "on", "or", "she", "that", "the", "their",
+    "they", "this", "to", "was", "were", "will", "with",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def article_lexical_text(article: dict) -> str:
+    """Headline, abstract, lead paragraph and keyword names of an NYT article (or stored metadata)."""
+    headline = article.get('headline', article.get('title', ''))
+    if isinstance(headline, dict):
+        headline = headline.get('main', '') or ''
+    keywords = article.get('keywords', [])
+    keyword_names = [k.get('value', k.get('name', '')) if isinstance(k, dict) else k for k in keywords]
+    return " ".join([
+        headline or '',
+        article.get('abstract', '') or '',
+        article.get('lead_paragraph', '') or '',
+        " ".join(keyword_names),
+    ])
+
+
+class BM25Index:
+    """
+    In-process inverted index with Okapi BM25 scoring, keyed by article URL.
+
+    Documents are added incrementally; re-adding a URL tombstones its previous version.
+    Postings are kept as Python lists while ingesting and converted to numpy arrays
+    on first use per term.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.keys: List[str] = []
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        self._key_to_id: Dict[str, int] = {}
+        self._deleted = set()
+        self._total_length = 0
+        self._cache: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._dead = None
+        self._dead_count = 0
+
+    def __len__(self) -> int:
+        return len(self.keys) - len(self._deleted)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._key_to_id
+
+    def add(self, key: str, text: str):
+        if key in self._key_to_id:
+            old_id = self._key_to_id[key]
+            self._deleted.add(old_id)
+            self._total_length -= self.doc_lengths[old_id]
+
+        doc_id = len(self.keys)
+        tokens = tokenize(text)
+        self.keys.append(key)
+        self.doc_lengths.append(len(tokens))
+        self._key_to_id[key] = doc_id
+        self._total_length += len(tokens)
+
+        for term, tf in Counter(tokens).items():
+            ids, tfs = self.postings.setdefault(term, ([], []))
+            ids.append(doc_id)
+            tfs.append(tf)
+            self._cache.pop(term, None)
+
+    def _term_arrays(self, term: str):
+        cached = self._cache.get(term)
+        if cached is None:
+            ids, tfs = self.postings[term]
+            cached = (np.asarray(ids, dtype=np.int64), np.asarray(tfs, dtype=np.float32))
+            self._cache[term] = cached
+        return cached
+
+    def _dead_mask(self):
+        """Boolean array marking tombstoned doc ids, or None while nothing was re-added."""
+        if not self._deleted:
+            return None
+        if self._dead is None or self._dead.size != len(self.keys) or self._dead_count != len(self._deleted):
+            self._dead = np.zeros(len(self.keys), dtype=bool)
+            self._dead[np.fromiter(self._deleted, dtype=np.int64)] = True
+            self._dead_count = len(self._deleted)
+        return self._dead
+
+    def search_ids(self, query: str, top_k: int = None, mask: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score every live document containing a query term into a dense array, one np.add.at
+        per term, and take the best with argpartition.
+
+        Args:
+            query (str): Query text, tokenized like the documents.
+            top_k (int, optional): Number of results; all matches when None.
+            mask (np.ndarray, optional): Boolean array over doc ids (len(self.keys)); only
+                documents marked True are ranked. Document frequencies still count every
+                live document.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Doc ids (indexes into self.keys) and BM25 scores, best first.
+        """
+        empty = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        num_docs = len(self)
+        if num_docs == 0 or (top_k is not None and top_k <= 0):
+            return empty
+        avg_length = self._total_length / num_docs
+        doc_lengths = np.asarray(self.doc_lengths, dtype=np.float32)
+        dead = self._dead_mask()
+        scores = np.zeros(len(self.keys), dtype=np.float32)
+        matched = np.zeros(len(self.keys), dtype=bool)
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            ids, tfs = self._term_arrays(term)
+            if dead is not None:
+                # Tombstoned versions of re-added docs must not count towards df
+                live = ~dead[ids]
+                ids, tfs = ids[live], tfs[live]
+            df = len(ids)
+            if df == 0:
+                continue
+            idf = math.log(1.0 + (num_docs - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1.0 - self.b + self.b * doc_lengths[ids] / max(avg_length, 1e-9))
+            np.add.at(scores, ids, idf * tfs * (self.k1 + 1.0) / (tfs + norm))
+            matched[ids] = True
+
+        if mask is not None:
+            matched &= mask
+        candidates = np.flatnonzero(matched)
+        if top_k is not None and candidates.size > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return candidates, scores[candidates]
+
+    def search(self, query: str, top_k: int = None) -> List[Tuple[str, float]]:
+        """
+        Score every document containing a query term.
+
+        Returns:
+            List[Tuple[str, float]]: (url, BM25 score) pairs, best first; all matches when
+            top_k is None.
+        """
+        ids, scores = self.search_ids(query, top_k)
+        return [(self.keys[doc_id], score) for doc_id, score in zip(ids.tolist(), scores.tolist())]
+
+    def save(self, path: str):
+        state = {
+            "k1": self.k1,
+            "b": self.b,
+            "keys": self.keys,
+            "doc_lengths": self.doc_lengths,
+            "postings": self.postings,
+            "deleted": self._deleted,
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        index = cls(k1=state["k1"], b=state["b"])
+        index.keys = state["keys"]
+        index.doc_lengths = state["doc_lengths"]
+        index.postings = state["postings"]
+        index._deleted = state["deleted"]
+        index._key_to_id = {key: doc_id for doc_id, key in enumerate(index.keys)}
+        index._total_length = sum(
+            length for doc_id, length in enumerate(index.doc_lengths) if doc_id not in index._deleted
+        )
+        return index
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60, weights: List[float] = None) -> List[Tuple[str, float]]:
+    """Fuse several best-first rankings of keys: score(key) = sum_i w_i / (k + rank_i(key))."""
+    weights = weights or [1.0] * len(rankings)
+    fused: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, key in enumerate(ranking, start=1):
+            fused[key] = fused.get(key, 0.0) + weight / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+
+def weighted_score_fusion(score_lists: List[Dict[str, float]], weights: List[float]) -> List[Tuple[str, float]]:
+    """Min-max normalize each {key: score} mapping and combine them with the given weights."""
+    fused: Dict[str, float] = {}
+    for scores, weight in zip(score_lists, weights):
+        if not scores:
+            continue
+        low, high = min(scores.values()), max(scores.values())
+        span = high - low if high > low else 1.0
+        for key, score in scores.items():
+            fused[key] = fused.get(key, 0.0) + weight * (score - low) / span
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
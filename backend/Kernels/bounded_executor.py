@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+
+class BoundedExecutor:
+    """
+    Thread pool for CPU-bound retrieval work (query encoding, index scans) called from asyncio.
+
+    At most max_workers calls run at once and at most max_pending more wait in the queue;
+    further callers are suspended until a slot frees up, so a burst of generations applies
+    backpressure instead of queueing unbounded work. Threads (rather than processes) share
+    the loaded model and memory-mapped index, and both torch and numpy release the GIL
+    while they compute.
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 8, thread_name_prefix: str = "retrieval"):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        # One asyncio.Semaphore per event loop: waiting is cancellable and ties up no thread
+        self._slots = weakref.WeakKeyDictionary()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        """Calls currently running or queued."""
+        return self._in_flight
+
+    def _loop_slots(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        with self._lock:
+            slots = self._slots.get(loop)
+            if slots is None:
+                slots = self._slots[loop] = asyncio.Semaphore(self.max_workers + self.max_pending)
+            return slots
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """Run fn(*args, **kwargs) on the pool without blocking the event loop and return its result."""
+        loop = asyncio.get_running_loop()
+        slots = self._loop_slots(loop)
+        # Pool and queue full: suspend until a slot frees up (cancelling the wait takes no slot)
+        await slots.acquire()
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release(loop, slots)
+            raise
+        # The slot is held until fn finishes, even if the awaiting coroutine is cancelled first
+        future.add_done_callback(lambda _: self._release(loop, slots))
+        return await asyncio.wrap_future(future)
+
+    def _release(self, loop: asyncio.AbstractEventLoop, slots: asyncio.Semaphore):
+        with self._lock:
+            self._in_flight -= 1
+        try:
+            loop.call_soon_threadsafe(slots.release)
+        except RuntimeError:
+            # Loop already closed; nothing is waiting on its semaphore any more
+            pass
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,102 @@
+import os
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Callable, Optional
+
+
+def normalize_query(text: str) -> str:
+    """Cache key for a query: lower-cased with whitespace collapsed."""
+    return " ".join(text.lower().split())
+
+
+class EmbeddingCache:
+    """
+    Bounded LRU cache of query embeddings keyed on the normalized query text.
+
+    Production traffic is dominated by a handful of repeated topics, so a hit skips the
+    SentenceTransformer forward pass entirely. The cache is thread-safe and can be
+    persisted to an .npz file so it survives restarts.
+    """
+
+    def __init__(self, max_size: int = 1024, persist_path: Optional[str] = None):
+        self.max_size = max_size
+        self.persist_path = persist_path
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        if persist_path and os.path.exists(persist_path):
+            self.load(persist_path)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        key = normalize_query(text)
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+
+    def put(self, text: str, vector: np.ndarray):
+        key = normalize_query(text)
+        with self._lock:
+            self._entries[key] = np.asarray(vector, dtype=np.float32)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, text: str, compute: Callable[[str], np.ndarray]) -> np.ndarray:
+        """Return the cached embedding for text, computing and caching it on a miss."""
+        vector = self.get(text)
+        if vector is None:
+            vector = np.asarray(compute(text), dtype=np.float32)
+            self.put(text, vector)
+        return vector
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def save(self, path: Optional[str] = None):
+        """Persist the cache (least recently used first) to an .npz file."""
+        path = path or self.persist_path
+        if not path:
+            return
+        with self._lock:
+            keys = list(self._entries)
+            vectors = np.stack(list(self._entries.values())) if keys else np.zeros((0, 0), dtype=np.float32)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, keys=np.asarray(keys, dtype=str), vectors=vectors)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str):
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                keys = data["keys"].tolist()
+                vectors = data["vectors"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Could not load embedding cache from {path}: {e}")
+            return
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                self._entries[key] = vector
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
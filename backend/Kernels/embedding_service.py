@@ -0,0 +1,334 @@
+"""
+Micro-batching embedding service.
+
+Concurrent encode requests are queued, collected for up to max_wait_ms (or until
+max_batch_size texts are waiting) and run as a single model forward pass; each caller
+gets back its own rows. The batcher runs in-process, or behind a Unix socket so several
+worker processes share one model:
+
+    python -m backend.Kernels.embedding_service /tmp/kraken-embed.sock
+
+Processes started with EMBEDDING_SERVICE_SOCKET=/tmp/kraken-embed.sock then encode
+through the sidecar (see get_encoder).
+
+Wire format (both directions): 4-byte big-endian length followed by a JSON header; encode
+responses follow the header with a second length-prefixed frame of raw float32 rows.
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import socket
+import struct
+import threading
+import socketserver
+import numpy as np
+from collections import deque
+from typing import Dict, List, Optional
+
+from backend.Kernels.model_registry import get_model, DEFAULT_MODEL_NAME
+
+SOCKET_ENV_VAR = "EMBEDDING_SERVICE_SOCKET"
+
+
+class _Request:
+    __slots__ = ("texts", "enqueued_at", "done", "result", "error")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.enqueued_at = time.monotonic()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class BatchMetrics:
+    """Counters plus rolling windows of batch size, queue latency and encode time."""
+
+    def __init__(self, window: int = 1024):
+        self.batches = 0
+        self.requests = 0
+        self.texts = 0
+        self._batch_sizes = deque(maxlen=window)
+        self._queue_ms = deque(maxlen=window)
+        self._encode_ms = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, batch: List[_Request], started: float, finished: float):
+        with self._lock:
+            self.batches += 1
+            self.requests += len(batch)
+            self.texts += sum(len(request.texts) for request in batch)
+            self._batch_sizes.append(sum(len(request.texts) for request in batch))
+            self._queue_ms.extend((started - request.enqueued_at) * 1000.0 for request in batch)
+            self._encode_ms.append((finished - started) * 1000.0)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            batch_sizes = np.asarray(self._batch_sizes, dtype=np.float64)
+            queue_ms = np.asarray(self._queue_ms, dtype=np.float64)
+            encode_ms = np.asarray(self._encode_ms, dtype=np.float64)
+            return {
+                "batches": self.batches,
+                "requests": self.requests,
+                "texts": self.texts,
+                "mean_batch_size": float(batch_sizes.mean()) if batch_sizes.size else 0.0,
+                "max_batch_size": float(batch_sizes.max()) if batch_sizes.size else 0.0,
+                "queue_ms_p50": float(np.percentile(queue_ms, 50)) if queue_ms.size else 0.0,
+                "queue_ms_p99": float(np.percentile(queue_ms, 99)) if queue_ms.size else 0.0,
+                "encode_ms_mean": float(encode_ms.mean()) if encode_ms.size else 0.0,
+            }
+
+
+class EmbeddingBatcher:
+    """
+    In-process micro-batcher with the same encode() call shape as SentenceTransformer:
+    a str returns one vector, a list returns a (n, dim) array. Thread-safe; each call
+    blocks until its batch has been encoded.
+
+    Args:
+        model_name (str): Model loaded through the model registry.
+        backend (str, optional): Model registry backend ("torch" or "onnx").
+        max_batch_size (int): Stop collecting once this many texts are waiting.
+        max_wait_ms (float): How long the first request in a batch may wait for company.
+    """
+
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME, max_batch_size: int = 64, max_wait_ms: float = 5.0,
+                 backend: str = None):
+        self.model_name = model_name
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.metrics = BatchMetrics()
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def encode(self, texts, batch_size: int = None, **kwargs) -> np.ndarray:
+        # batch_size and other SentenceTransformer arguments are accepted for compatibility only.
+        single = isinstance(texts, str)
+        items = [texts] if single else list(texts)
+        if not items:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        self._ensure_started()
+        request = _Request(items)
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result[0] if single else request.result
+
+    def stats(self) -> Dict[str, float]:
+        return self.metrics.stats()
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+
+    def _collect(self, first: _Request) -> List[_Request]:
+        batch = [first]
+        count = len(first.texts)
+        deadline = time.monotonic() + self.max_wait
+        while count < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                # Finish this batch, then stop.
+                self._queue.put(None)
+                break
+            batch.append(request)
+            count += len(request.texts)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            texts = [text for request in batch for text in request.texts]
+            started = time.monotonic()
+            try:
+                vectors = np.asarray(get_model(self.model_name, self.backend).encode(texts, batch_size=len(texts)), dtype=np.float32)
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+                    request.done.set()
+                continue
+            finished = time.monotonic()
+
+            offset = 0
+            for request in batch:
+                request.result = vectors[offset:offset + len(request.texts)]
+                offset += len(request.texts)
+                request.done.set()
+            self.metrics.record(batch, started, finished)
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+
+def _send_frame(sock: socket.socket, payload: bytes):
+    sock.sendall(struct.pack(">I", len(payload)) + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv_frame(sock: socket.socket) -> Optional[bytes]:
+    header = _recv_exact(sock, 4)
+    if header is None:
+        return None
+    return _recv_exact(sock, struct.unpack(">I", header)[0])
+
+
+class EmbeddingServer:
+    """Serves an EmbeddingBatcher over a Unix socket; one handler thread per client connection."""
+
+    def __init__(self, socket_path: str, batcher: EmbeddingBatcher = None):
+        self.socket_path = socket_path
+        self.batcher = batcher or EmbeddingBatcher()
+
+        batcher = self.batcher
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                while True:
+                    frame = _recv_frame(self.request)
+                    if frame is None:
+                        return
+                    message = json.loads(frame)
+                    try:
+                        if message.get("op") == "stats":
+                            _send_frame(self.request, json.dumps({"stats": batcher.stats()}).encode("utf-8"))
+                            continue
+                        vectors = np.ascontiguousarray(batcher.encode(message["texts"]), dtype=np.float32)
+                    except Exception as e:
+                        _send_frame(self.request, json.dumps({"error": str(e)}).encode("utf-8"))
+                        continue
+                    _send_frame(self.request, json.dumps({"shape": list(vectors.shape)}).encode("utf-8"))
+                    _send_frame(self.request, vectors.tobytes())
+
+        self._handler = Handler
+        self._server = None
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, self._handler)
+        self._server.daemon_threads = True
+        print(f"Embedding service for {self.batcher.model_name} listening on {self.socket_path}")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+
+
+class EmbeddingClient:
+    """encode() against an EmbeddingServer sidecar; keeps one connection per calling thread."""
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self._local = threading.local()
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _call(self, message: dict):
+        sock = self._connection()
+        try:
+            _send_frame(sock, json.dumps(message).encode("utf-8"))
+            header = _recv_frame(sock)
+            if header is None:
+                raise ConnectionError("Embedding service closed the connection")
+            header = json.loads(header)
+            if "error" in header:
+                raise RuntimeError(f"Embedding service error: {header['error']}")
+            if "shape" not in header:
+                return header
+            payload = _recv_frame(sock)
+            if payload is None:
+                raise ConnectionError("Embedding service closed the connection")
+            return np.frombuffer(payload, dtype=np.float32).reshape(header["shape"])
+        except (OSError, ConnectionError):
+            # Drop the broken connection; the next call reconnects.
+            sock.close()
+            self._local.sock = None
+            raise
+
+    def encode(self, texts, batch_size: int = None, **kwargs) -> np.ndarray:
+        single = isinstance(texts, str)
+        items = [texts] if single else list(texts)
+        if not items:
+            return np.zeros((0, 0), dtype=np.float32)
+        vectors = self._call({"op": "encode", "texts": items})
+        return vectors[0] if single else vectors
+
+    def stats(self) -> Dict[str, float]:
+        return self._call({"op": "stats"})["stats"]
+
+
+_encoders: Dict[tuple, object] = {}
+_encoders_lock = threading.Lock()
+
+
+def get_encoder(model_name: str = DEFAULT_MODEL_NAME, backend: str = None):
+    """
+    Process-wide encoder for query-time embedding: an EmbeddingClient when
+    EMBEDDING_SERVICE_SOCKET points at a running sidecar (which serves the model it was
+    started with), otherwise an in-process EmbeddingBatcher for model_name and backend.
+    """
+    key = (model_name, backend)
+    encoder = _encoders.get(key)
+    if encoder is not None:
+        return encoder
+    with _encoders_lock:
+        encoder = _encoders.get(key)
+        if encoder is None:
+            socket_path = os.getenv(SOCKET_ENV_VAR)
+            encoder = EmbeddingClient(socket_path) if socket_path else EmbeddingBatcher(model_name, backend=backend)
+            _encoders[key] = encoder
+    return encoder
+
+
+if __name__ == "__main__":
+    # python -m backend.Kernels.embedding_service [socket_path] [model_name] [torch|onnx]
+    socket_path = sys.argv[1] if len(sys.argv) > 1 else "/tmp/kraken-embed.sock"
+    model_name = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_MODEL_NAME
+    backend = sys.argv[3] if len(sys.argv) > 3 else None
+    get_model(model_name, backend)
+    EmbeddingServer(socket_path, EmbeddingBatcher(model_name, backend=backend)).serve_forever()
@@ -0,0 +1,69 @@
+import os
+import threading
+from typing import Callable, List, Optional, Tuple, Union
+
+
+class IndexWatcher:
+    """
+    Polls the files backing an index and rebuilds it in the background when they change.
+
+    A file's generation is its (inode, mtime_ns, size); writers publish with os.replace, so
+    any new version changes the inode. `paths` may be a callable, re-evaluated on every poll,
+    for stores whose last-published file changes (e.g. vectors.json until a binary store
+    manifest exists); a different path list counts as a change. When the generation changes,
+    `build` is run on the watcher thread and its result handed to `on_swap`, which should
+    publish it with a single attribute assignment. Readers that captured the previous
+    index keep using that snapshot until they finish.
+    """
+
+    def __init__(self, paths: Union[List[str], Callable[[], List[str]]], build: Callable[[], object], on_swap: Callable[[object], None],
+                 interval: float = 5.0):
+        self.paths = paths
+        self.build = build
+        self.on_swap = on_swap
+        self.interval = interval
+        self.generation = self._signature()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _signature(self) -> Tuple:
+        signature = []
+        for path in (self.paths() if callable(self.paths) else self.paths):
+            try:
+                stat = os.stat(path)
+                signature.append((path, (stat.st_ino, stat.st_mtime_ns, stat.st_size)))
+            except FileNotFoundError:
+                signature.append((path, None))
+        return tuple(signature)
+
+    def check_now(self) -> bool:
+        """Rebuild and swap if the watched files changed. Returns True if a swap happened."""
+        signature = self._signature()
+        if signature == self.generation or any(stat is None for _, stat in signature):
+            return False
+        try:
+            new_index = self.build()
+        except Exception as e:
+            # Keep serving the old index; retry on the next poll.
+            print(f"Index rebuild failed, keeping current index: {e}")
+            return False
+        self.on_swap(new_index)
+        self.generation = signature
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check_now()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="index-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
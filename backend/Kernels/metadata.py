@@ -1,10 +1,16 @@
 import os
+import time
+import asyncio
+import aiohttp
 import requests
 import json
-from datetime import datetime, timedelta
+from datetime import datetime
 import calendar
 import logging
 from dotenv import load_dotenv
+from typing import List, Dict, Tuple, Optional
+
+from backend.Kernels.archive_reader import iter_docs
 
 # Load environment variables
 load_dotenv()
@@ -13,8 +19,52 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Status codes worth retrying with backoff
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def month_offset(year: int, month: int, offset: int) -> Tuple[int, int]:
+    """(year, month) that is `offset` months after (year, month); negative offsets go back."""
+    index = year * 12 + (month - 1) + offset
+    return index // 12, index % 12 + 1
+
+
+def article_key(doc: Dict) -> str:
+    return doc.get('_id') or doc.get('web_url') or ''
+
+
+class RateLimiter:
+    """Spaces request starts at least 60 / requests_per_minute seconds apart across coroutines."""
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
 class NYTimesMetadataFetcher:
-    def __init__(self):
+    def __init__(self, max_concurrency: int = 4, requests_per_minute: float = 5, max_retries: int = 4,
+                 backoff_base: float = 2.0):
+        """
+        Args:
+            max_concurrency (int): Archive requests in flight at once in run_async.
+            requests_per_minute (float): Rate limit across all requests (the Archive API allows 5/min).
+            max_retries (int): Retries for 429/5xx responses and connection errors.
+            backoff_base (float): First retry delay in seconds, doubled on each retry
+                unless the response sends Retry-After.
+        """
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
         self.api_key = os.getenv('NYTIMES_API_KEY')
         if not self.api_key:
             raise ValueError("NYTimes API key not found in environment variables")
@@ -22,6 +72,11 @@ class NYTimesMetadataFetcher:
         self.base_url = "https://api.nytimes.com/svc/archive/v1"
         self.output_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "News", "Metadata")
         
+        # Docs newly merged into a month, for downstream vectorization
+        self.delta_dir = os.path.join(os.path.dirname(self.output_dir), "Deltas")
+        # ETag / Last-Modified of every fetched month, for conditional requests
+        self.state_file = os.path.join(os.path.dirname(self.output_dir), "fetch_state.json")
+        
         # Create output directory if it doesn't exist
         os.makedirs(self.output_dir, exist_ok=True)
     
@@ -66,33 +121,185 @@ class NYTimesMetadataFetcher:
         
         for i in range(num_months):
             # Calculate the month that is i months ago
-            date = now - timedelta(days=30*i)
-            months.append((date.year, date.month))
+            months.append(month_offset(now.year, now.month, -i))
         
         return months
+
+    def load_fetch_state(self) -> Dict[str, Dict[str, str]]:
+        if not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Error reading {self.state_file}: {e}")
+            return {}
+
+    def save_fetch_state(self, state: Dict[str, Dict[str, str]]):
+        tmp_path = self.state_file + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_file)
+
+    async def fetch_archive_async(self, session: aiohttp.ClientSession, limiter: RateLimiter, year: int, month: int,
+                                  validators: Optional[Dict[str, str]] = None) -> Tuple[int, Optional[Dict], Dict[str, str]]:
+        """
+        Fetch one month under the rate limit, retrying 429/5xx and connection errors with
+        exponential backoff.
+
+        Args:
+            validators (Dict[str, str], optional): Stored {"etag", "last_modified"} of the month,
+                sent as If-None-Match / If-Modified-Since.
+
+        Returns:
+            (status, data, validators): status 304 with data None when the month is unchanged,
+            0 with data None when every attempt failed.
+        """
+        url = f"{self.base_url}/{year}/{month}.json"
+        headers = {}
+        if validators:
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+
+        for attempt in range(self.max_retries + 1):
+            await limiter.wait()
+            logger.info(f"Fetching NYTimes archive data for {year}-{month:02d}")
+            delay = self.backoff_base * (2 ** attempt)
+            try:
+                async with session.get(url, params={'api-key': self.api_key}, headers=headers) as response:
+                    if response.status == 304:
+                        logger.info(f"{year}-{month:02d} not modified since last fetch")
+                        return 304, None, validators or {}
+                    if response.status in RETRY_STATUSES:
+                        retry_after = response.headers.get('Retry-After')
+                        if retry_after and retry_after.isdigit():
+                            delay = float(retry_after)
+                        logger.warning(f"Status {response.status} for {year}-{month:02d}, "
+                                       f"retrying in {delay:.0f}s ({attempt + 1}/{self.max_retries})")
+                    else:
+                        response.raise_for_status()
+                        data = await response.json(content_type=None)
+                        new_validators = {
+                            'etag': response.headers.get('ETag'),
+                            'last_modified': response.headers.get('Last-Modified'),
+                        }
+                        return response.status, data, new_validators
+            except aiohttp.ClientResponseError as e:
+                logger.error(f"Error fetching data for {year}-{month:02d}: {e}")
+                return 0, None, {}
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(f"Error fetching data for {year}-{month:02d}: {e}, "
+                               f"retrying in {delay:.0f}s ({attempt + 1}/{self.max_retries})")
+            if attempt < self.max_retries:
+                await asyncio.sleep(delay)
+        logger.error(f"Giving up on {year}-{month:02d} after {self.max_retries + 1} attempts")
+        return 0, None, {}
+
+    def merge_month(self, data: Dict, year: int, month: int) -> List[Dict]:
+        """
+        Merge freshly fetched data into the stored month file: docs it does not have yet are
+        appended and stored docs whose content changed are replaced in place. The file is
+        rewritten only when something changed. Returns the new and changed docs.
+        """
+        filename = self.get_filename(year, month)
+        fetched = data.get('response', {}).get('docs', [])
+        if not os.path.exists(filename):
+            self.save_data(data, year, month)
+            return fetched
+
+        stored = list(iter_docs(filename))
+        position = {article_key(doc): i for i, doc in enumerate(stored)}
+        added, changed = [], []
+        for doc in fetched:
+            key = article_key(doc)
+            i = position.get(key)
+            if i is None:
+                position[key] = len(stored) + len(added)
+                added.append(doc)
+            elif i < len(stored) and doc != stored[i]:
+                stored[i] = doc
+                changed.append(doc)
+        if not added and not changed:
+            logger.info(f"No new or changed articles for {year}-{month:02d}")
+            return []
+
+        data.setdefault('response', {})['docs'] = stored + added
+        tmp_path = filename + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, filename)
+        logger.info(f"Merged {len(added)} new and {len(changed)} changed articles into {filename}")
+        return changed + added
+
+    def save_delta(self, delta: List[Dict], year: int, month: int) -> Optional[str]:
+        """Write the docs a refetch of a stored month added or changed to News/Deltas/delta_YYYY_MM_<timestamp>.json."""
+        if not delta:
+            return None
+        os.makedirs(self.delta_dir, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%dT%H%M%S')
+        filename = os.path.join(self.delta_dir, f"delta_{year}_{month:02d}_{stamp}.json")
+        with open(filename, 'w') as f:
+            json.dump({'year': year, 'month': month, 'docs': delta}, f)
+        logger.info(f"Saved {len(delta)} new articles to {filename}")
+        return filename
+
+    async def run_async(self, num_months: int = 12) -> List[Dict]:
+        """
+        Fetch the months of the last num_months that have no file yet, plus the current and the
+        previous month, concurrently. The previous month is always included because the archive
+        keeps changing for a while after a month ends; stored months are requested conditionally
+        and only their new docs are merged into the stored file.
+
+        Returns:
+            List[Dict]: Docs added by this run (the delta for downstream vectorization).
+        """
+        now = datetime.now()
+        recent = {(now.year, now.month), month_offset(now.year, now.month, -1)}
+        months = [
+            (year, month) for year, month in self.get_previous_months(max(num_months, 2))
+            if (year, month) in recent or not os.path.exists(self.get_filename(year, month))
+        ]
+        state = self.load_fetch_state()
+        limiter = RateLimiter(self.requests_per_minute)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        delta = []
+
+        async def fetch_month(session, year, month):
+            key = os.path.basename(self.get_filename(year, month))
+            # Validators only mean something while the stored file is there
+            existed = os.path.exists(self.get_filename(year, month))
+            validators = state.get(key) if existed else None
+            # A failing month (e.g. a corrupt stored file) is logged and skipped; the others go on
+            try:
+                async with semaphore:
+                    status, data, new_validators = await self.fetch_archive_async(session, limiter, year, month, validators)
+                if data is None:
+                    return
+                new_docs = self.merge_month(data, year, month)
+                state[key] = new_validators
+                delta.extend(new_docs)
+                # A first-time backfill is the whole month file already; only updates get a delta file
+                if existed:
+                    self.save_delta(new_docs, year, month)
+            except Exception as e:
+                logger.error(f"Error updating {year}-{month:02d}: {e}")
+
+        logger.info(f"Fetching {len(months)} months: {', '.join(f'{y}-{m:02d}' for y, m in months)}")
+        timeout = aiohttp.ClientTimeout(total=120)
+        try:
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                await asyncio.gather(*(fetch_month(session, year, month) for year, month in months),
+                                     return_exceptions=True)
+        finally:
+            self.save_fetch_state(state)
+        logger.info(f"Fetched {len(delta)} new articles")
+        return delta
     
     def run(self):
         """Main method to fetch and save NYTimes archive data"""
-        # Get current month
-        now = datetime.now()
-        current_year, current_month = now.year, now.month
-        
-        # Check if we need to fetch previous months
-        current_month_file = self.get_filename(current_year, current_month)
-        
-        if os.path.exists(current_month_file):
-            # If current month file exists, only fetch and update current month
-            logger.info(f"Current month file exists. Updating only current month data.")
-            data = self.fetch_archive(current_year, current_month)
-            self.save_data(data, current_year, current_month)
-        else:
-            # If current month file doesn't exist, fetch last 3 months
-            logger.info(f"Current month file doesn't exist. Fetching last 12 months data.")
-            months_to_fetch = self.get_previous_months(12)
-            
-            for year, month in months_to_fetch:
-                data = self.fetch_archive(year, month)
-                self.save_data(data, year, month)
+        return asyncio.run(self.run_async())
 
 def main():
     try:
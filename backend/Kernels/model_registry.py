@@ -0,0 +1,47 @@
+import os
+import threading
+from typing import Dict, Iterable, Tuple
+
+DEFAULT_MODEL_NAME = 'multi-qa-MiniLM-L6-cos-v1'
+
+# "torch" (SentenceTransformer) or "onnx" (int8 ONNX Runtime, see onnx_encoder)
+DEFAULT_BACKEND = os.getenv('EMBEDDING_BACKEND', 'torch')
+
+_models: Dict[Tuple[str, str], object] = {}
+_lock = threading.Lock()
+
+
+def get_model(model_name: str = DEFAULT_MODEL_NAME, backend: str = None):
+    """
+    Return the process-wide encoder for model_name, loading it on first use.
+    Every caller (RunVectorization, Embedor, the retrieval vectorizer) shares one instance
+    per (model_name, backend); backend defaults to the EMBEDDING_BACKEND environment variable.
+    """
+    key = (model_name, backend or DEFAULT_BACKEND)
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            print(f"Loading embedding model {model_name} ({key[1]} backend)...")
+            if key[1] == 'onnx':
+                from backend.Kernels.onnx_encoder import OnnxSentenceEncoder
+                model = OnnxSentenceEncoder(model_name)
+            elif key[1] == 'torch':
+                from sentence_transformers import SentenceTransformer
+                model = SentenceTransformer(model_name)
+            else:
+                raise ValueError(f"Unknown embedding backend: {key[1]}")
+            _models[key] = model
+    return model
+
+
+def warm_up(model_names: Iterable[str] = (DEFAULT_MODEL_NAME,), backend: str = None):
+    """Load the given models and run one encode each so the first request does not pay for it."""
+    for model_name in model_names:
+        get_model(model_name, backend).encode("warm up")
+
+
+def loaded_models():
+    return list(_models)
@@ -0,0 +1,205 @@
+"""
+ONNX Runtime backend for the sentence embedding model.
+
+The SentenceTransformer's transformer is exported once to ONNX, dynamically quantized to
+int8 weights and cached under backend/Models/onnx/<model_name>/. Pooling and
+normalization run in numpy, so inference needs onnxruntime and transformers (for the
+tokenizer) but not PyTorch; exporting still needs sentence_transformers and torch.
+
+Select it with get_model(name, backend="onnx"), EMBEDDING_BACKEND=onnx, or the
+embedding_backend argument of RunVectorization / Embedor. Check the drift against the
+PyTorch model with:
+
+    python -m backend.Kernels.onnx_encoder [model_name]
+"""
+
+import os
+import sys
+import json
+import time
+import numpy as np
+from typing import List, Dict, Any
+
+DEFAULT_ONNX_DIR = "backend/Models/onnx"
+
+PARITY_TEXTS = [
+    "Latest updates on election lawsuits",
+    "Federal Reserve holds interest rates steady amid inflation concerns",
+    "Tesla shares slide after quarterly deliveries miss estimates",
+    "Ukraine and Russia exchange prisoners in rare deal",
+    "How a drought is reshaping farming in the American West",
+    "The best books of the year, chosen by our critics",
+    "Supreme Court hears arguments over tariffs",
+    "AAPL",
+]
+
+
+def _model_dir(model_name: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, model_name.replace("/", "__"))
+
+
+def export_onnx(model_name: str, out_dir: str, quantize: bool = True, opset: int = 14) -> Dict[str, Any]:
+    """
+    Export a SentenceTransformer's transformer to out_dir/model.onnx (and an int8
+    model_int8.onnx when quantize is set), together with its tokenizer and pooling config.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(out_dir, exist_ok=True)
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer = st_model[0]
+    pooling = st_model[1].get_config_dict()
+    tokenizer = transformer.tokenizer
+
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class TokenEmbeddings(torch.nn.Module):
+        def __init__(self, auto_model):
+            super().__init__()
+            self.auto_model = auto_model
+
+        def forward(self, *inputs):
+            return self.auto_model(**dict(zip(input_names, inputs)), return_dict=True).last_hidden_state
+
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["token_embeddings"]}
+    fp32_path = os.path.join(out_dir, "model.onnx")
+    torch.onnx.export(
+        TokenEmbeddings(transformer.auto_model).eval(),
+        tuple(sample[name] for name in input_names),
+        fp32_path,
+        input_names=input_names,
+        output_names=["token_embeddings"],
+        dynamic_axes=dynamic_axes,
+        opset_version=opset,
+    )
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(fp32_path, os.path.join(out_dir, "model_int8.onnx"), weight_type=QuantType.QInt8)
+
+    tokenizer.save_pretrained(out_dir)
+    config = {
+        "model_name": model_name,
+        "pooling": "cls" if pooling.get("pooling_mode_cls_token") else "mean",
+        "normalize": any(type(module).__name__ == "Normalize" for module in st_model),
+        "max_seq_length": st_model.max_seq_length,
+    }
+    with open(os.path.join(out_dir, "encoder_config.json"), "w") as f:
+        json.dump(config, f, indent=2)
+    print(f"Exported {model_name} to {out_dir}")
+    return config
+
+
+class OnnxSentenceEncoder:
+    """
+    Drop-in replacement for SentenceTransformer.encode backed by ONNX Runtime.
+
+    Args:
+        model_name (str): sentence-transformers model to export / load.
+        cache_dir (str): Where exported models are kept.
+        quantize (bool): Use the int8 dynamically quantized graph.
+        num_threads (int, optional): ONNX Runtime intra-op threads (default: all cores).
+    """
+
+    def __init__(self, model_name: str, cache_dir: str = DEFAULT_ONNX_DIR, quantize: bool = True,
+                 num_threads: int = None):
+        try:
+            import onnxruntime as ort
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise ImportError("The onnx embedding backend needs `pip install onnxruntime transformers`") from e
+
+        self.model_name = model_name
+        self.model_dir = _model_dir(model_name, cache_dir)
+        model_file = "model_int8.onnx" if quantize else "model.onnx"
+        model_path = os.path.join(self.model_dir, model_file)
+        if not os.path.exists(model_path):
+            export_onnx(model_name, self.model_dir, quantize=quantize)
+
+        with open(os.path.join(self.model_dir, "encoder_config.json"), "r") as f:
+            self.config = json.load(f)
+        self.max_seq_length = self.config["max_seq_length"]
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [model_input.name for model_input in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
+
+    def _pool(self, token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        if self.config["pooling"] == "cls":
+            pooled = token_embeddings[:, 0]
+        else:
+            mask = attention_mask[..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        if self.config["normalize"]:
+            pooled = pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled.astype(np.float32)
+
+    def encode(self, sentences, batch_size: int = 32, **kwargs) -> np.ndarray:
+        """Embed a str (returns one vector) or a list of str (returns a (n, dim) array)."""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        # Batch texts of similar length together to minimise padding, as SentenceTransformer does.
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            batch = [texts[i] for i in order[start:start + batch_size]]
+            encoded = self.tokenizer(batch, padding=True, truncation=True, max_length=self.max_seq_length,
+                                     return_tensors="np")
+            feeds = {name: encoded[name].astype(np.int64) for name in self.input_names}
+            token_embeddings = self.session.run(None, feeds)[0]
+            batches.append(self._pool(token_embeddings, encoded["attention_mask"]))
+
+        vectors = np.empty((len(texts), batches[0].shape[1]), dtype=np.float32)
+        vectors[order] = np.concatenate(batches)
+        return vectors[0] if single else vectors
+
+
+def check_parity(model_name: str, texts: List[str] = None, quantize: bool = True, min_cosine: float = 0.98,
+                 cache_dir: str = DEFAULT_ONNX_DIR) -> Dict[str, Any]:
+    """
+    Compare the ONNX backend against the PyTorch SentenceTransformer on texts.
+
+    Returns:
+        Dict[str, Any]: Min / mean cosine similarity between the two embeddings of each text,
+        per-backend encode time, and whether min_cosine was met.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    texts = texts or PARITY_TEXTS
+    torch_model = SentenceTransformer(model_name, device="cpu")
+    onnx_model = OnnxSentenceEncoder(model_name, cache_dir=cache_dir, quantize=quantize)
+
+    started = time.perf_counter()
+    torch_vectors = np.asarray(torch_model.encode(texts), dtype=np.float32)
+    torch_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    onnx_vectors = onnx_model.encode(texts)
+    onnx_seconds = time.perf_counter() - started
+
+    cosine = (torch_vectors * onnx_vectors).sum(axis=1) / (
+        np.linalg.norm(torch_vectors, axis=1) * np.linalg.norm(onnx_vectors, axis=1))
+    return {
+        "model_name": model_name,
+        "quantized": quantize,
+        "texts": len(texts),
+        "min_cosine": float(cosine.min()),
+        "mean_cosine": float(cosine.mean()),
+        "torch_seconds": torch_seconds,
+        "onnx_seconds": onnx_seconds,
+        "passed": bool(cosine.min() >= min_cosine),
+    }
+
+
+if __name__ == "__main__":
+    from backend.Kernels.model_registry import DEFAULT_MODEL_NAME
+    report = check_parity(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_MODEL_NAME)
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report["passed"] else 1)
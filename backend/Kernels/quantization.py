@@ -0,0 +1,166 @@
+import numpy as np
+from typing import Dict, Sequence
+
+
+class ScalarQuantizer:
+    """
+    Per-dimension int8 scalar quantization (4x smaller than float32).
+
+    Each dimension is mapped linearly from its [min, max] training range onto 256 levels.
+    Inner products against a float query are computed directly from the codes.
+    """
+
+    def __init__(self):
+        self.vmin = None
+        self.scale = None
+
+    def train(self, vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.vmin = vectors.min(axis=0)
+        vmax = vectors.max(axis=0)
+        self.scale = np.maximum(vmax - self.vmin, 1e-12) / 255.0
+        return self
+
+    def encode(self, vectors: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        codes = np.empty(vectors.shape, dtype=np.int8)
+        for start in range(0, vectors.shape[0], chunk_size):
+            chunk = np.asarray(vectors[start:start + chunk_size], dtype=np.float32)
+            levels = np.rint((chunk - self.vmin) / self.scale)
+            codes[start:start + chunk_size] = np.clip(levels, 0, 255) - 128
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return (codes.astype(np.float32) + 128.0) * self.scale + self.vmin
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"vmin": self.vmin, "scale": self.scale}
+
+    def load_state(self, state: Dict[str, np.ndarray]):
+        self.vmin = np.asarray(state["vmin"], dtype=np.float32)
+        self.scale = np.asarray(state["scale"], dtype=np.float32)
+        return self
+
+    def score(self, codes: np.ndarray, query: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        """Approximate inner products between every coded vector and a float query."""
+        weights = (self.scale * query).astype(np.float32)
+        bias = float(128.0 * weights.sum() + self.vmin @ query)
+        scores = np.empty(codes.shape[0], dtype=np.float32)
+        for start in range(0, codes.shape[0], chunk_size):
+            scores[start:start + chunk_size] = codes[start:start + chunk_size].astype(np.float32) @ weights
+        return scores + bias
+
+
+class ProductQuantizer:
+    """
+    Product quantization with asymmetric distance computation (ADC).
+
+    Vectors are split into `m` sub-vectors, each replaced by the id of its nearest of
+    `ksub` (<= 256) sub-centroids, so a 384-d float32 vector (1536 bytes) becomes `m`
+    bytes. At query time a (m, ksub) table of sub-centroid / sub-query inner products is
+    built once and each vector's score is the sum of m table lookups.
+    """
+
+    def __init__(self, m: int = 48, ksub: int = 256, kmeans_iters: int = 15,
+                 max_train_size: int = 50000, seed: int = 0):
+        if ksub > 256:
+            raise ValueError("ksub must be <= 256 to fit codes in uint8")
+        self.m = m
+        self.ksub = ksub
+        self.kmeans_iters = kmeans_iters
+        self.max_train_size = max_train_size
+        self.seed = seed
+        self.codebooks = None  # (m, ksub, dsub)
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        n, dim = vectors.shape
+        if dim % self.m != 0:
+            raise ValueError(f"Vector dimension {dim} is not divisible by m={self.m}")
+        return vectors.reshape(n, self.m, dim // self.m)
+
+    def train(self, vectors: np.ndarray):
+        rng = np.random.default_rng(self.seed)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.shape[0] > self.max_train_size:
+            vectors = vectors[rng.choice(vectors.shape[0], self.max_train_size, replace=False)]
+        sub = self._split(vectors)
+        ksub = min(self.ksub, vectors.shape[0])
+
+        codebooks = []
+        for j in range(self.m):
+            x = sub[:, j, :]
+            centroids = x[rng.choice(x.shape[0], ksub, replace=False)].copy()
+            for _ in range(self.kmeans_iters):
+                assignments = self._nearest(x, centroids)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assignments, x)
+                counts = np.bincount(assignments, minlength=ksub)
+                filled = counts > 0
+                centroids[filled] = sums[filled] / counts[filled, None]
+            codebooks.append(centroids)
+        self.codebooks = np.stack(codebooks)
+        return self
+
+    @staticmethod
+    def _nearest(x: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        # argmin ||x - c||^2 == argmin (||c||^2 - 2 x.c)
+        distances = (centroids ** 2).sum(axis=1) - 2.0 * (x @ centroids.T)
+        return np.argmin(distances, axis=1)
+
+    def encode(self, vectors: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        codes = np.empty((vectors.shape[0], self.m), dtype=np.uint8)
+        for start in range(0, vectors.shape[0], chunk_size):
+            sub = self._split(vectors[start:start + chunk_size])
+            for j in range(self.m):
+                codes[start:start + chunk_size, j] = self._nearest(sub[:, j, :], self.codebooks[j])
+        return codes
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"codebooks": self.codebooks}
+
+    def load_state(self, state: Dict[str, np.ndarray]):
+        self.codebooks = np.asarray(state["codebooks"], dtype=np.float32)
+        self.m, self.ksub = self.codebooks.shape[0], self.codebooks.shape[1]
+        return self
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        parts = [self.codebooks[j][codes[:, j]] for j in range(self.m)]
+        return np.concatenate(parts, axis=1)
+
+    def score(self, codes: np.ndarray, query: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        """ADC inner products between every coded vector and a float query."""
+        sub_query = query.astype(np.float32).reshape(self.m, -1)
+        table = np.einsum("jkd,jd->jk", self.codebooks, sub_query)
+        rows = np.arange(self.m)
+        scores = np.empty(codes.shape[0], dtype=np.float32)
+        for start in range(0, codes.shape[0], chunk_size):
+            scores[start:start + chunk_size] = table[rows, codes[start:start + chunk_size]].sum(axis=1)
+        return scores
+
+
+def build_quantizer(mode: str, **kwargs):
+    """Create a quantizer by name: 'int8' (scalar) or 'pq' (product quantization)."""
+    if mode == "int8":
+        return ScalarQuantizer()
+    if mode == "pq":
+        return ProductQuantizer(**kwargs)
+    raise ValueError(f"Unknown quantization mode: {mode}")
+
+
+def save_quantizer(quantizer, path: str):
+    """Write a trained quantizer's parameters (scales or codebooks) to an .npz file object or path."""
+    mode = "int8" if isinstance(quantizer, ScalarQuantizer) else "pq"
+    np.savez(path, mode=np.asarray(mode), **quantizer.state())
+
+
+def load_quantizer(path: str):
+    """Rebuild a quantizer written by save_quantizer without retraining it."""
+    with np.load(path) as state:
+        return build_quantizer(str(state["mode"])).load_state(state)
+
+
+def recall_at_k(exact_rows: Sequence[int], approx_rows: Sequence[int]) -> float:
+    """Fraction of the exact top-k rows that the approximate search also returned."""
+    if len(exact_rows) == 0:
+        return 1.0
+    return len(set(exact_rows) & set(approx_rows)) / len(exact_rows)
@@ -0,0 +1,205 @@
+import json
+import numpy as np
+from typing import List, Dict, Any, Iterable, Tuple, Optional
+
+from backend.Kernels.vector_index import parse_pub_date, normalize_rows
+
+
+class RedisVectorStore:
+    """
+    Redis layout for article vectors that can be searched with bulk round trips.
+
+    Keys (all under `prefix`):
+        {prefix}vec:{url}   raw float32 bytes of the vector
+        {prefix}meta:{url}  JSON-encoded article metadata
+        {prefix}pub_ts      sorted set of every stored URL, scored by pub_date epoch
+                            (-inf when the article has no parseable pub_date)
+        {prefix}content_hash  hash of URL -> fingerprint of the text the vector was built from
+
+    The sorted set doubles as the URL registry, so searches never scan the keyspace,
+    and vectors are fetched with pipelined MGETs of `chunk_size` keys each.
+    """
+
+    def __init__(self, redis_client, prefix: str = "kraken:", chunk_size: int = 1000):
+        self.redis_client = redis_client
+        self.prefix = prefix
+        self.chunk_size = chunk_size
+        self.pub_ts_key = f"{prefix}pub_ts"
+        self.content_hash_key = f"{prefix}content_hash"
+
+    def _vec_key(self, url: str) -> str:
+        return f"{self.prefix}vec:{url}"
+
+    def _meta_key(self, url: str) -> str:
+        return f"{self.prefix}meta:{url}"
+
+    def _chunks(self, items: List[Any]) -> Iterable[List[Any]]:
+        for i in range(0, len(items), self.chunk_size):
+            yield items[i:i + self.chunk_size]
+
+    def count(self) -> int:
+        """Number of URLs stored under this layout."""
+        return self.redis_client.zcard(self.pub_ts_key)
+
+    def contains(self, url: str) -> bool:
+        return self.redis_client.zscore(self.pub_ts_key, url) is not None
+
+    def contains_many(self, urls: List[str]) -> List[bool]:
+        """Check which URLs are already stored, using one pipeline of ZSCOREs per chunk."""
+        found = []
+        for chunk in self._chunks(urls):
+            pipe = self.redis_client.pipeline(transaction=False)
+            for url in chunk:
+                pipe.zscore(self.pub_ts_key, url)
+            found.extend(score is not None for score in pipe.execute())
+        return found
+
+    def content_hashes_many(self, urls: List[str]) -> List[Optional[str]]:
+        """Fetch the stored content fingerprints for `urls` with chunked HMGETs."""
+        pipe = self.redis_client.pipeline(transaction=False)
+        for chunk in self._chunks(urls):
+            pipe.hmget(self.content_hash_key, chunk)
+        hashes = []
+        for values in pipe.execute():
+            hashes.extend(v.decode("utf-8") if isinstance(v, bytes) else v for v in values)
+        return hashes
+
+    def set_content_hashes(self, hashes: Dict[str, str]):
+        """Record content fingerprints without touching the stored vectors."""
+        items = list(hashes.items())
+        for chunk in self._chunks(items):
+            self.redis_client.hset(self.content_hash_key, mapping=dict(chunk))
+
+    def put_many(self, items: List[Tuple[str, Any, Dict[str, Any]]], content_hashes: List[str] = None):
+        """
+        Store (url, vector, metadata) triples using one pipeline per chunk. content_hashes,
+        if given, is a parallel list of fingerprints of each vector's source text.
+        """
+        for start in range(0, len(items), self.chunk_size):
+            chunk = items[start:start + self.chunk_size]
+            pipe = self.redis_client.pipeline(transaction=False)
+            for url, vector, metadata in chunk:
+                ts = parse_pub_date(metadata.get("pub_date"))
+                pipe.set(self._vec_key(url), np.asarray(vector, dtype=np.float32).tobytes())
+                pipe.set(self._meta_key(url), json.dumps(metadata))
+                pipe.zadd(self.pub_ts_key, {url: ts if ts is not None else float("-inf")})
+            if content_hashes is not None:
+                chunk_hashes = content_hashes[start:start + self.chunk_size]
+                pipe.hset(self.content_hash_key, mapping={url: h for (url, _, _), h in zip(chunk, chunk_hashes)})
+            pipe.execute()
+
+    def put(self, url: str, vector, metadata: Dict[str, Any]):
+        self.put_many([(url, vector, metadata)])
+
+    def get_vector(self, url: str) -> Optional[np.ndarray]:
+        data = self.redis_client.get(self._vec_key(url))
+        if data is None:
+            return None
+        return np.frombuffer(data, dtype=np.float32)
+
+    def get_metadata(self, url: str) -> Optional[Dict[str, Any]]:
+        data = self.redis_client.get(self._meta_key(url))
+        if data is None:
+            return None
+        return json.loads(data)
+
+    def get_metadata_many(self, urls: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Fetch metadata for many URLs with chunked, pipelined MGETs."""
+        pipe = self.redis_client.pipeline(transaction=False)
+        for chunk in self._chunks(urls):
+            pipe.mget([self._meta_key(url) for url in chunk])
+        metadata = []
+        for values in pipe.execute():
+            metadata.extend(json.loads(value) if value is not None else None for value in values)
+        return metadata
+
+    def urls_in_range(self, start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> List[str]:
+        """Return stored URLs, restricted to a pub_date window when either bound is given."""
+        if start_ts is None and end_ts is None:
+            members = self.redis_client.zrange(self.pub_ts_key, 0, -1)
+        else:
+            members = self.redis_client.zrangebyscore(
+                self.pub_ts_key,
+                start_ts if start_ts is not None else "-inf",
+                end_ts if end_ts is not None else "+inf",
+            )
+        return [m.decode("utf-8") if isinstance(m, bytes) else m for m in members]
+
+    def load_entries(self, start_ts: Optional[int] = None,
+                     end_ts: Optional[int] = None) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        Load every stored vector (optionally within a pub_date window) for building an
+        in-memory index.
+
+        Returns:
+            Tuple[List[str], np.ndarray, np.ndarray]: URLs, normalized float32 vectors and
+            pub_date epochs (articles without a pub_date get 0).
+        """
+        members = self.redis_client.zrangebyscore(
+            self.pub_ts_key,
+            start_ts if start_ts is not None else "-inf",
+            end_ts if end_ts is not None else "+inf",
+            withscores=True,
+        )
+        scores = {}
+        for member, score in members:
+            url = member.decode("utf-8") if isinstance(member, bytes) else member
+            scores[url] = int(score) if np.isfinite(score) else 0
+        urls, matrix = self.load_vectors(list(scores))
+        return urls, matrix, np.asarray([scores[url] for url in urls], dtype=np.int64)
+
+    def load_vectors(self, urls: List[str]) -> Tuple[List[str], np.ndarray]:
+        """
+        Fetch vectors for `urls` with chunked MGETs in a single pipeline.
+
+        Returns:
+            Tuple[List[str], np.ndarray]: The URLs that had a vector and an L2-normalized
+            float32 matrix with one row per URL.
+        """
+        pipe = self.redis_client.pipeline(transaction=False)
+        for chunk in self._chunks(urls):
+            pipe.mget([self._vec_key(url) for url in chunk])
+
+        found_urls = []
+        buffers = []
+        for chunk, values in zip(self._chunks(urls), pipe.execute()):
+            for url, value in zip(chunk, values):
+                if value is None:
+                    continue
+                found_urls.append(url)
+                buffers.append(value)
+
+        if not buffers:
+            return [], np.zeros((0, 0), dtype=np.float32)
+
+        matrix = np.frombuffer(b"".join(buffers), dtype=np.float32).reshape(len(buffers), -1).copy()
+        return found_urls, normalize_rows(matrix)
+
+    def search(self, query_vector: np.ndarray, top_k: int = 5,
+               start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Exact cosine search over the stored vectors within an optional pub_date window.
+
+        Returns:
+            List[Dict[str, Any]]: Dictionaries with 'url', 'score' and 'metadata', best match first.
+        """
+        urls, matrix = self.load_vectors(self.urls_in_range(start_ts, end_ts))
+        if not urls or top_k <= 0:
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32).ravel()
+        query_norm = np.linalg.norm(query)
+        if query_norm == 0:
+            return []
+        scores = matrix @ (query / query_norm)
+
+        k = min(top_k, len(urls))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(urls) else np.arange(len(urls))
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        top_urls = [urls[i] for i in top]
+        metadata = self.get_metadata_many(top_urls)
+        return [
+            {'url': url, 'score': float(scores[i]), 'metadata': meta}
+            for url, i, meta in zip(top_urls, top, metadata)
+        ]
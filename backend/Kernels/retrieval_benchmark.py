@@ -0,0 +1,300 @@
+"""
+Retrieval benchmark over synthetic NYT-shaped corpora.
+
+Generates articles (headline, abstract, lead paragraph, section, document type, keywords,
+pub_date spread over a window of days) with topic-clustered unit vectors, builds each
+index type and reports build time, memory, p50/p99 query latency and recall@k against
+exact float32 search, as JSON:
+
+    python -m backend.Kernels.retrieval_benchmark --sizes 10000 100000 --out bench.json
+    python -m backend.Kernels.retrieval_benchmark --sizes 1000000 --indexes flat int8 ivf
+    python -m backend.Kernels.retrieval_benchmark --sizes 10000 --redis-host localhost
+
+Queries are pre-computed vectors, so timings cover the index only (no model forward pass).
+Half of the queries carry a date window (the most recent window_days) like the
+orchestrator's fresh-news queries.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import platform
+import tracemalloc
+import numpy as np
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+from backend.Kernels.vector_index import VectorIndex, parse_pub_date
+from backend.Kernels.ann_index import IVFIndex
+from backend.Kernels.binary_vector_store import write_binary_store, load_binary_index
+from backend.Kernels.segmented_index import SegmentedIndex
+from backend.Kernels.bm25_index import BM25Index, article_lexical_text
+from backend.Kernels.quantization import recall_at_k
+
+SECTIONS = ["U.S.", "World", "Business Day", "Technology", "Opinion", "Sports", "Arts", "Science", "Health",
+            "Climate", "Politics", "New York"]
+DOCUMENT_TYPES = ["article"] * 9 + ["multimedia"]
+WORDS = ("market election court climate vaccine tariff senate startup ukraine china rates inflation museum "
+         "football drought housing strike merger lawsuit earnings ai chip oil storm police school budget").split()
+
+ALL_INDEXES = ["flat", "int8", "pq", "ivf", "binary", "segmented", "bm25", "redis"]
+
+
+def synthetic_corpus(size: int, dim: int = 384, topics: int = 64, days: int = 365, seed: int = 0,
+                     end: datetime = datetime(2025, 4, 30, tzinfo=timezone.utc)) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+    """
+    Records in the run_vectorization_shallow format plus their (size, dim) float32 vectors.
+    Vectors are drawn around `topics` random centroids so neighbourhoods are non-trivial.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((topics, dim)).astype(np.float32)
+    topic_of = rng.integers(0, topics, size)
+    vectors = centroids[topic_of] + 0.8 * rng.standard_normal((size, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    end_ts = int(end.timestamp())
+    pub_ts = end_ts - rng.integers(0, days * 86400, size)
+    records = []
+    for i in range(size):
+        words = rng.choice(WORDS, 12)
+        pub_date = datetime.fromtimestamp(int(pub_ts[i]), timezone.utc).strftime("%Y-%m-%dT%H:%M:%S+0000")
+        records.append({
+            "web_url": f"https://www.nytimes.com/synthetic/{i}.html",
+            "vector": vectors[i],
+            "content_hash": f"{i:040x}",
+            "metadata": {
+                "title": {"main": " ".join(words[:6]).capitalize()},
+                "abstract": " ".join(words[3:12]),
+                "lead_paragraph": " ".join(words),
+                "snippet": " ".join(words[3:12]),
+                "pub_date": pub_date,
+                "section_name": SECTIONS[topic_of[i] % len(SECTIONS)],
+                "document_type": DOCUMENT_TYPES[i % len(DOCUMENT_TYPES)],
+                "keywords": [str(word).title() for word in words[:3]],
+            },
+        })
+    return records, vectors
+
+
+def synthetic_queries(vectors: np.ndarray, count: int, seed: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """Queries near random corpus vectors (a perturbed copy), normalized, and the rows they were drawn from."""
+    rng = np.random.default_rng(seed)
+    sources = rng.integers(0, vectors.shape[0], count)
+    queries = vectors[sources] + 0.5 * rng.standard_normal((count, vectors.shape[1])).astype(np.float32) \
+        / np.sqrt(vectors.shape[1])
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True), sources
+
+
+def _measure_build(build: Callable[[], Any]) -> Tuple[Any, float, int]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    index = build()
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return index, seconds, peak
+
+
+def _nbytes(*arrays) -> int:
+    return int(sum(array.nbytes for array in arrays if isinstance(array, np.ndarray) and not isinstance(array, np.memmap)))
+
+
+def _run_queries(search: Callable[[int, np.ndarray, Optional[int]], List[str]], queries: np.ndarray,
+                 windows: List[Optional[int]], exact: Optional[List[List[str]]]) -> Dict[str, float]:
+    """Time search(position, query, start_ts) per query; recall is left out when exact is None."""
+    latencies = []
+    recalls = []
+    for i, (query, start_ts) in enumerate(zip(queries, windows)):
+        started = time.perf_counter()
+        found = search(i, query, start_ts)
+        latencies.append((time.perf_counter() - started) * 1000.0)
+        if exact is not None:
+            recalls.append(recall_at_k(exact[i], found))
+    latencies = np.asarray(latencies)
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "mean_ms": float(latencies.mean()),
+        "recall_at_k": float(np.mean(recalls)) if recalls else None,
+    }
+
+
+def benchmark_size(size: int, indexes: List[str], dim: int = 384, num_queries: int = 200, top_k: int = 10,
+                   window_days: int = 2, redis_host: str = None, redis_port: int = 6379, seed: int = 0) -> Dict[str, Any]:
+    print(f"Generating {size} synthetic articles...", file=sys.stderr)
+    records, vectors = synthetic_corpus(size, dim=dim, seed=seed)
+    queries, sources = synthetic_queries(vectors, num_queries, seed=seed + 1)
+    latest = max(parse_pub_date(record["metadata"]["pub_date"]) for record in records)
+    windows = [latest - window_days * 86400 if i % 2 else None for i in range(num_queries)]
+
+    # Exact reference answers from full-precision brute force.
+    reference = VectorIndex.from_records(records)
+    url_of = reference.urls
+    exact = []
+    for query, start_ts in zip(queries, windows):
+        rows, _ = reference.search(query, top_k, start_ts=start_ts)
+        exact.append([url_of[row] for row in rows])
+
+    results = {"size": size, "dim": dim, "queries": num_queries, "top_k": top_k, "indexes": {}}
+    workdir = tempfile.mkdtemp(prefix="kraken_bench_")
+    try:
+        for name in indexes:
+            print(f"  {name}...", file=sys.stderr)
+            try:
+                results["indexes"][name] = _benchmark_index(name, records, vectors, queries, sources, windows, exact,
+                                                            top_k, workdir, redis_host, redis_port)
+            except Exception as e:
+                results["indexes"][name] = {"error": f"{type(e).__name__}: {e}"}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def _benchmark_index(name, records, vectors, queries, sources, windows, exact, top_k, workdir, redis_host, redis_port):
+    if name == "flat":
+        index, seconds, peak = _measure_build(lambda: VectorIndex.from_records(records))
+        urls = index.urls
+
+        def search(i, query, start_ts):
+            rows, _ = index.search(query, top_k, start_ts=start_ts)
+            return [urls[row] for row in rows]
+        memory = _nbytes(index.vectors, index.pub_ts, index.offsets)
+
+    elif name in ("int8", "pq"):
+        # Quantized indexes run on the binary store: codes are scanned, float32 rows are paged in for rescoring
+        base = os.path.join(workdir, f"vectors_{name}")
+        _, write_seconds, _ = _measure_build(lambda: write_binary_store(records, base, quantization=name))
+        index, seconds, peak = _measure_build(lambda: load_binary_index(base, quantization=name))
+
+        def search(i, query, start_ts):
+            rows, _ = index.search(query, top_k, start_ts=start_ts)
+            return [index.get_record(row)["web_url"] for row in rows]
+        memory = int(index.codes.nbytes) + _nbytes(index.offsets)
+        seconds += write_seconds
+
+    elif name == "binary":
+        base = os.path.join(workdir, "vectors")
+        _, write_seconds, _ = _measure_build(lambda: write_binary_store(records, base))
+        index, seconds, peak = _measure_build(lambda: load_binary_index(base))
+
+        def search(i, query, start_ts):
+            rows, _ = index.search(query, top_k, start_ts=start_ts)
+            return [index.get_record(row)["web_url"] for row in rows]
+        memory = _nbytes(index.offsets)
+        seconds += write_seconds
+
+    elif name == "ivf":
+        urls = [record["web_url"] for record in records]
+        pub_ts = [parse_pub_date(record["metadata"]["pub_date"]) for record in records]
+
+        def build():
+            ivf = IVFIndex(min_train_size=0)
+            ivf.add(urls, vectors, pub_ts)
+            ivf.train()
+            return ivf
+        index, seconds, peak = _measure_build(build)
+
+        def search(i, query, start_ts):
+            return [url for url, _ in index.search(query, top_k, start_ts=start_ts)]
+        memory = peak
+
+    elif name == "segmented":
+        segment_dir = os.path.join(workdir, "segments")
+
+        def build():
+            segmented = SegmentedIndex(segment_dir, head_max_size=max(1, len(records) // 16))
+            segmented.add(records)
+            segmented.flush()
+            segmented.compact()
+            return segmented
+        index, seconds, peak = _measure_build(build)
+
+        def search(i, query, start_ts):
+            return [record["web_url"] for record, _ in index.search(query, top_k, start_ts=start_ts)]
+        memory = peak
+
+    elif name == "bm25":
+        # Lexical only, queried with the headline of each query's source article; recall
+        # against the semantic reference is not meaningful, so only latency is reported.
+        def build():
+            lexical = BM25Index()
+            for record in records:
+                lexical.add(record["web_url"], article_lexical_text(record["metadata"]))
+            return lexical
+        index, seconds, peak = _measure_build(build)
+
+        def search(i, query, start_ts):
+            headline = records[sources[i]]["metadata"]["title"]["main"]
+            return [url for url, _ in index.search(headline, top_k)]
+        stats = _run_queries(search, queries, windows, None)
+        return {"build_seconds": seconds, "build_peak_bytes": peak, "index_bytes": peak, **stats}
+
+    elif name == "redis":
+        if not redis_host:
+            return {"skipped": "pass --redis-host to benchmark the Redis path"}
+        import redis
+        from backend.Kernels.redis_vector_store import RedisVectorStore
+        client = redis.Redis(host=redis_host, port=redis_port)
+        store = RedisVectorStore(client, prefix="kraken_bench:")
+        items = [(record["web_url"], record["vector"], record["metadata"]) for record in records]
+        _, seconds, peak = _measure_build(lambda: [store.put_many(items[i:i + store.chunk_size])
+                                                  for i in range(0, len(items), store.chunk_size)])
+
+        def search(i, query, start_ts):
+            return [hit["url"] for hit in store.search(query, top_k=top_k, start_ts=start_ts)]
+        try:
+            stats = _run_queries(search, queries, windows, exact)
+        finally:
+            for key in client.scan_iter("kraken_bench:*"):
+                client.delete(key)
+        return {"build_seconds": seconds, "build_peak_bytes": peak, **stats}
+
+    else:
+        raise ValueError(f"Unknown index type: {name}")
+
+    stats = _run_queries(search, queries, windows, exact)
+    return {"build_seconds": seconds, "build_peak_bytes": peak, "index_bytes": memory, **stats}
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Benchmark retrieval paths on synthetic NYT-shaped corpora")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--indexes", nargs="+", default=[name for name in ALL_INDEXES if name != "redis"],
+                        choices=ALL_INDEXES)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--window-days", type=int, default=2)
+    parser.add_argument("--redis-host")
+    parser.add_argument("--redis-port", type=int, default=6379)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    indexes = args.indexes + (["redis"] if args.redis_host and "redis" not in args.indexes else [])
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "machine": {"platform": platform.platform(), "python": platform.python_version(),
+                    "numpy": np.__version__, "cpus": os.cpu_count()},
+        "results": [
+            benchmark_size(size, indexes, dim=args.dim, num_queries=args.queries, top_k=args.top_k,
+                           window_days=args.window_days, redis_host=args.redis_host,
+                           redis_port=args.redis_port, seed=args.seed)
+            for size in args.sizes
+        ],
+    }
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+    return report
+
+
+if __name__ == "__main__":
+    main()
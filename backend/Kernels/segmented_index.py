@@ -0,0 +1,333 @@
+"""
+Time-partitioned vector index made of immutable segments plus a small mutable head.
+
+Fresh articles go to the in-memory head segment. flush() writes the head out as one
+immutable binary segment per month it touches (see binary_vector_store), and compaction
+later merges a month's segments into a single month-level segment. Ingestion therefore
+only ever writes new, small segments; it never rewrites the whole store.
+
+For a segment directory such as backend/News/segments:
+    manifest.json                      next sequence number and the live segments
+    2025_04_batch_00000007.npy ...     one binary store per segment
+
+A URL that is re-ingested supersedes its older copy. Superseded rows stay in their
+(immutable) segment until compaction drops them and are skipped at query time.
+Queries skip every segment whose [min_ts, max_ts] does not overlap the date window.
+"""
+
+import os
+import json
+import threading
+import numpy as np
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
+
+from backend.Kernels.vector_index import VectorIndex, parse_pub_date
+from backend.Kernels.binary_vector_store import load_binary_index, remove_binary_store, write_binary_store
+
+HEAD_NAME = "head"
+
+
+def month_of(ts: int) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y_%m")
+
+
+class Segment:
+    """A VectorIndex plus its manifest entry and the number of rows superseded since it was written."""
+
+    def __init__(self, name: str, index: VectorIndex, level: str = "batch", month: str = None, seq: int = 0):
+        self.name = name
+        self.index = index
+        self.level = level
+        self.month = month
+        self.seq = seq
+        self.dead = 0
+        self.urls = [index.get_record(row).get("web_url", "") for row in range(len(index))]
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def min_ts(self) -> int:
+        return int(self.index.pub_ts[0])
+
+    @property
+    def max_ts(self) -> int:
+        return int(self.index.pub_ts[-1])
+
+    def overlaps(self, start_ts: Optional[int], end_ts: Optional[int]) -> bool:
+        if len(self) == 0:
+            return False
+        if start_ts is not None and self.max_ts < start_ts:
+            return False
+        if end_ts is not None and self.min_ts > end_ts:
+            return False
+        return True
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "level": self.level,
+            "month": self.month,
+            "seq": self.seq,
+            "min_ts": self.min_ts if len(self) else None,
+            "max_ts": self.max_ts if len(self) else None,
+            "count": len(self),
+        }
+
+
+class SegmentedIndex:
+    """
+    Segmented, time-partitioned replacement for the flat shallow vector store.
+
+    Args:
+        segment_dir (str): Directory holding manifest.json and the segment files.
+        head_max_size (int): add() flushes the head once it holds this many records.
+        compaction_threshold (int): Segments a month may accumulate before compaction merges
+            it; months other than the current one are merged as soon as they have two.
+        quantization (str, optional): Codes stored with every segment and used by its searches.
+    """
+
+    def __init__(self, segment_dir: str, head_max_size: int = 2048, compaction_threshold: int = 4,
+                 quantization: str = None):
+        self.segment_dir = segment_dir
+        self.head_max_size = head_max_size
+        self.compaction_threshold = compaction_threshold
+        self.quantization = quantization
+        os.makedirs(segment_dir, exist_ok=True)
+
+        manifest = self._read_manifest()
+        self.next_seq = manifest["next_seq"]
+        self.segments: List[Segment] = [
+            Segment(info["name"], load_binary_index(self._base_path(info["name"]), quantization=quantization),
+                    level=info["level"], month=info["month"], seq=info["seq"])
+            for info in sorted(manifest["segments"], key=lambda info: info["seq"])
+        ]
+        # url -> name of the segment holding its live copy; later segments win
+        self._latest: Dict[str, str] = {}
+        by_name = {segment.name: segment for segment in self.segments}
+        for segment in self.segments:
+            for url in segment.urls:
+                previous = self._latest.get(url)
+                if previous is not None:
+                    by_name[previous].dead += 1
+                self._latest[url] = segment.name
+
+        self._head_records: Dict[str, Dict[str, Any]] = {}
+        self._head: Optional[Segment] = None
+        self._lock = threading.RLock()
+        self._compaction_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+    def _base_path(self, name: str) -> str:
+        return os.path.join(self.segment_dir, name)
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.segment_dir, "manifest.json")
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        if not os.path.exists(self._manifest_path()):
+            return {"next_seq": 0, "segments": []}
+        with open(self._manifest_path(), "r") as f:
+            return json.load(f)
+
+    def _write_manifest(self, segments: List[Segment]):
+        """Persist segments as the live set; callers assign self.segments only once this succeeded."""
+        manifest = {"next_seq": self.next_seq, "segments": [segment.info() for segment in segments]}
+        tmp_path = f"{self._manifest_path()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self._manifest_path())
+
+    def _remove_segment_files(self, name: str):
+        remove_binary_store(self._base_path(name))
+
+    def _segment_by_name(self, name: str) -> Optional[Segment]:
+        for segment in self.segments:
+            if segment.name == name:
+                return segment
+        return None
+
+    def add(self, records: List[Dict[str, Any]]):
+        """
+        Add records in the run_vectorization_shallow format to the head segment, superseding
+        any older copy of the same web_url. Records without a vector or pub_date are ignored.
+        """
+        with self._lock:
+            for record in records:
+                url = record.get("web_url")
+                if not url or record.get("vector") is None \
+                        or parse_pub_date(record.get("metadata", {}).get("pub_date")) is None:
+                    continue
+                previous = self._latest.get(url)
+                if previous is not None and previous != HEAD_NAME:
+                    self._segment_by_name(previous).dead += 1
+                self._latest[url] = HEAD_NAME
+                self._head_records[url] = record
+            self._head = None
+            if len(self._head_records) >= self.head_max_size:
+                self.flush()
+
+    def _head_segment(self) -> Optional[Segment]:
+        with self._lock:
+            if self._head is None and self._head_records:
+                index = VectorIndex.from_records(list(self._head_records.values()))
+                self._head = Segment(HEAD_NAME, index, level="head")
+            return self._head
+
+    def flush(self):
+        """Write the head out as one immutable segment per publication month."""
+        with self._lock:
+            if not self._head_records:
+                return
+            seq = self.next_seq
+            by_month: Dict[str, List[Dict[str, Any]]] = {}
+            for record in self._head_records.values():
+                ts = parse_pub_date(record["metadata"]["pub_date"])
+                by_month.setdefault(month_of(ts), []).append(record)
+
+            written = []
+            for month, month_records in sorted(by_month.items()):
+                name = f"{month}_batch_{seq:08d}"
+                write_binary_store(month_records, self._base_path(name), quantization=self.quantization)
+                index = load_binary_index(self._base_path(name), quantization=self.quantization)
+                written.append(Segment(name, index, level="batch", month=month, seq=seq))
+
+            self.next_seq = seq + 1
+            segments = self.segments + written
+            self._write_manifest(segments)
+            self.segments = segments
+            for segment, (_, month_records) in zip(written, sorted(by_month.items())):
+                for record in month_records:
+                    self._latest[record["web_url"]] = segment.name
+            self._head_records = {}
+            self._head = None
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """The live record stored for url, or None."""
+        with self._lock:
+            name = self._latest.get(url)
+            if name is None:
+                return None
+            if name == HEAD_NAME:
+                return self._head_records[url]
+            segment = self._segment_by_name(name)
+        return segment.index.get_record(segment.index.url_rows()[url])
+
+    def search(self, query_vector: np.ndarray, top_k: int = 5, start_ts: Optional[int] = None,
+               end_ts: Optional[int] = None, rescore_factor: int = 4) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Search every segment overlapping [start_ts, end_ts] and merge the per-segment results.
+
+        Returns:
+            List[Tuple[Dict[str, Any], float]]: (record, cosine similarity) pairs, best first.
+        """
+        with self._lock:
+            segments = list(self.segments)
+        head = self._head_segment()
+        if head is not None:
+            segments.append(head)
+        latest = self._latest
+
+        candidates = []
+        for segment in segments:
+            if not segment.overlaps(start_ts, end_ts):
+                continue
+            # Over-fetch by the number of superseded rows so they cannot crowd out live ones.
+            rows, scores = segment.index.search(query_vector, top_k=top_k + segment.dead,
+                                                start_ts=start_ts, end_ts=end_ts, rescore_factor=rescore_factor)
+            for row, score in zip(rows.tolist(), scores.tolist()):
+                if latest.get(segment.urls[row]) == segment.name:
+                    candidates.append((score, segment, row))
+
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        return [(segment.index.get_record(row), score) for score, segment, row in candidates[:top_k]]
+
+    def compact(self) -> int:
+        """
+        Merge each month's segments into one month-level segment, dropping superseded rows.
+        Closed months are merged once they have two segments, the current month once it
+        reaches compaction_threshold. Returns the number of months compacted.
+        """
+        current_month = datetime.now(timezone.utc).strftime("%Y_%m")
+        compacted = 0
+        with self._compaction_lock:
+            with self._lock:
+                by_month: Dict[str, List[Segment]] = {}
+                for segment in self.segments:
+                    by_month.setdefault(segment.month, []).append(segment)
+
+            for month, group in sorted(by_month.items()):
+                threshold = self.compaction_threshold if month == current_month else 2
+                if len(group) < threshold:
+                    continue
+                self._merge(month, group)
+                compacted += 1
+        return compacted
+
+    def _merge(self, month: str, group: List[Segment]):
+        names = {segment.name for segment in group}
+        seq = max(segment.seq for segment in group)
+        name = f"{month}_month_{seq:08d}"
+
+        # The merged segments are immutable, so the expensive write happens outside the lock.
+        records = []
+        for segment in group:
+            for row, url in enumerate(segment.urls):
+                if self._latest.get(url) == segment.name:
+                    record = dict(segment.index.get_record(row))
+                    record["vector"] = segment.index.row_vectors(np.asarray([row]))[0]
+                    records.append(record)
+        merged = None
+        if records:
+            write_binary_store(records, self._base_path(name), quantization=self.quantization)
+            merged = Segment(name, load_binary_index(self._base_path(name), quantization=self.quantization),
+                             level="month", month=month, seq=seq)
+
+        with self._lock:
+            # Every row of the group was superseded: the month's segments are dropped, not replaced.
+            segments = [segment for segment in self.segments if segment.name not in names]
+            if merged is not None:
+                segments = sorted(segments + [merged], key=lambda segment: segment.seq)
+            self._write_manifest(segments)
+            self.segments = segments
+            if merged is not None:
+                # Rows superseded while the merge was being written stay dead in the new segment.
+                for url in merged.urls:
+                    if self._latest.get(url) in names:
+                        self._latest[url] = name
+                    else:
+                        merged.dead += 1
+
+        for old_name in names - {name}:
+            self._remove_segment_files(old_name)
+        if merged is None:
+            print(f"Dropped {len(group)} fully superseded segments of {month}")
+        else:
+            print(f"Compacted {len(group)} segments of {month} into {name} ({len(merged)} rows)")
+
+    def _run(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"Segment compaction failed: {e}")
+
+    def start_compaction(self, interval: float = 300.0):
+        """Run compact() every interval seconds on a background daemon thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(interval,), name="segment-compaction",
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def stop_compaction(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,364 @@
+import numpy as np
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Tuple, Optional, Sequence
+
+from backend.Kernels.quantization import build_quantizer, recall_at_k
+
+# Metadata fields with a row-id index; keyword values are matched case-insensitively.
+ATTRIBUTE_FIELDS = ("section_name", "document_type", "keywords")
+
+
+def parse_pub_date(pub_date_str: str) -> Optional[int]:
+    """
+    Parse an NYT pub_date string (e.g. '2025-04-01T00:12:20+0000') into UTC epoch seconds.
+    Returns None if the string is missing or cannot be parsed.
+    """
+    if not pub_date_str:
+        return None
+    try:
+        pub_date = datetime.fromisoformat(pub_date_str.replace("Z", "+00:00"))
+    except (ValueError, TypeError, AttributeError):
+        return None
+    return to_epoch(pub_date)
+
+
+def to_epoch(dt: datetime) -> int:
+    """Convert a datetime to UTC epoch seconds. Naive datetimes are assumed to be UTC."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row of a float32 matrix in place (zero rows are left as zeros)."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+class VectorIndex:
+    """
+    In-memory index over the article vectors stored in vectors.json.
+
+    All vectors are packed into one contiguous, L2-normalized float32 matrix so a query
+    is a single matrix-vector product. Parallel arrays hold each row's publication date
+    (UTC epoch seconds), URL and the offset of its original record.
+
+    Rows are sorted by publication date, so a date window resolves to a contiguous row
+    slice with a binary search on pub_ts and only that slice is scored.
+    """
+
+    def __init__(self, vectors: np.ndarray, pub_ts: np.ndarray, urls: Optional[List[str]],
+                 offsets: np.ndarray, records: Sequence[Dict[str, Any]]):
+        self.vectors = vectors
+        self.pub_ts = pub_ts
+        self.urls = urls
+        self.offsets = offsets
+        self.records = records
+        self.quantizer = None
+        self.codes = None
+        self._url_rows = None
+        self._attributes = None
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]], quantization: Optional[str] = None) -> "VectorIndex":
+        """
+        Build the index from the list of dicts produced by run_vectorization_shallow.
+        Records without a vector or a parseable pub_date are left out of the index.
+        quantization ('int8' or 'pq') replaces the float32 matrix with compressed codes (see
+        quantize()); for codes with full-precision rescoring use the binary store instead, where
+        the matrix stays on disk.
+        """
+        rows = []
+        pub_ts = []
+        urls = []
+        offsets = []
+        for offset, item in enumerate(records):
+            vector = item.get("vector")
+            ts = parse_pub_date(item.get("metadata", {}).get("pub_date"))
+            if vector is None or ts is None:
+                continue
+            rows.append(vector)
+            pub_ts.append(ts)
+            urls.append(item.get("web_url", ""))
+            offsets.append(offset)
+
+        if not rows:
+            return cls(
+                vectors=np.zeros((0, 0), dtype=np.float32),
+                pub_ts=np.zeros(0, dtype=np.int64),
+                urls=[],
+                offsets=np.zeros(0, dtype=np.int64),
+                records=records,
+            )
+
+        pub_ts = np.asarray(pub_ts, dtype=np.int64)
+        order = np.argsort(pub_ts, kind="stable")
+        vectors = normalize_rows(np.ascontiguousarray(np.asarray(rows, dtype=np.float32)[order]))
+
+        index = cls(
+            vectors=vectors,
+            pub_ts=pub_ts[order],
+            urls=[urls[i] for i in order],
+            offsets=np.asarray(offsets, dtype=np.int64)[order],
+            records=records,
+        )
+        if quantization:
+            index.quantize(quantization, keep_full_precision=False)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.pub_ts)
+
+    def get_record(self, row: int) -> Dict[str, Any]:
+        """Return the original record backing an index row."""
+        return self.records[self.offsets[row]]
+
+    def url_rows(self) -> Dict[str, int]:
+        """Map of web_url to index row, built on first use."""
+        if self._url_rows is None:
+            self._scan_records()
+        return self._url_rows
+
+    def attribute_index(self) -> Dict[str, Dict[str, np.ndarray]]:
+        """Sorted row ids per value of each ATTRIBUTE_FIELDS metadata field, built on first use."""
+        if self._attributes is None:
+            self._scan_records()
+        return self._attributes
+
+    def _scan_records(self):
+        # One pass over the records (each is a JSON decode on a binary store) builds both maps.
+        url_rows = {}
+        postings = {field: {} for field in ATTRIBUTE_FIELDS}
+        for row in range(len(self)):
+            record = self.get_record(row)
+            if record.get("web_url"):
+                url_rows[record["web_url"]] = row
+            metadata = record.get("metadata", {})
+            for field in ATTRIBUTE_FIELDS:
+                values = metadata.get(field)
+                if not values:
+                    continue
+                if field == "keywords":
+                    values = {value.lower() for value in values}
+                else:
+                    values = [values]
+                for value in values:
+                    postings[field].setdefault(value, []).append(row)
+        self._attributes = {
+            field: {value: np.asarray(rows, dtype=np.int64) for value, rows in by_value.items()}
+            for field, by_value in postings.items()
+        }
+        self._url_rows = url_rows
+
+    def filter_rows(self, filters: Dict[str, Any]) -> np.ndarray:
+        """
+        Sorted row ids matching structured filters, e.g.
+            {"section_name": {"U.S.", "World"}, "document_type": "article", "keywords": "Tesla"}
+        Each field accepts one value or a collection (any of them matches); fields are ANDed.
+        """
+        attributes = self.attribute_index()
+        rows = None
+        for field, wanted in filters.items():
+            if field not in attributes:
+                raise ValueError(f"Unsupported filter field: {field}")
+            if isinstance(wanted, str):
+                wanted = [wanted]
+            if field == "keywords":
+                wanted = [value.lower() for value in wanted]
+            matches = [attributes[field][value] for value in wanted if value in attributes[field]]
+            field_rows = np.unique(np.concatenate(matches)) if matches else np.zeros(0, dtype=np.int64)
+            rows = field_rows if rows is None else np.intersect1d(rows, field_rows, assume_unique=True)
+        return rows if rows is not None else np.arange(len(self), dtype=np.int64)
+
+    def _eligible_rows(self, lo: int, hi: int, filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Filtered rows inside [lo, hi), or None when no filters are given."""
+        if not filters:
+            return None
+        rows = self.filter_rows(filters)
+        return rows[np.searchsorted(rows, lo):np.searchsorted(rows, hi)]
+
+    def date_slice(self, start_ts: Optional[int] = None, end_ts: Optional[int] = None) -> Tuple[int, int]:
+        """Resolve an inclusive pub_date window to the [lo, hi) row range it covers."""
+        lo = int(np.searchsorted(self.pub_ts, start_ts, side="left")) if start_ts is not None else 0
+        hi = int(np.searchsorted(self.pub_ts, end_ts, side="right")) if end_ts is not None else len(self)
+        return lo, max(lo, hi)
+
+    def quantize(self, mode: str, keep_full_precision: bool = True, **kwargs) -> "VectorIndex":
+        """
+        Build a compressed copy of the vectors ('int8' scalar or 'pq' product quantization)
+        that searches score first. Full-precision vectors are kept for rescoring unless
+        keep_full_precision is False; with a memory-mapped store they stay on disk and
+        only the rescored candidate rows are paged in.
+        """
+        if len(self) == 0:
+            return self
+        self.quantizer = build_quantizer(mode, **kwargs).train(np.asarray(self.vectors))
+        self.codes = self.quantizer.encode(self.vectors)
+        if not keep_full_precision:
+            self.vectors = None
+        return self
+
+    def search(self, query_vector: np.ndarray, top_k: int = 5,
+               start_ts: Optional[int] = None, end_ts: Optional[int] = None,
+               rescore_factor: int = 4, exact: bool = False,
+               filters: Optional[Dict[str, Any]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the top_k rows most similar to query_vector, optionally restricted to
+        rows published within [start_ts, end_ts] and matching filters (see filter_rows).
+        Filtered row ids are intersected with the date slice first, so only eligible rows
+        are scored.
+
+        On a quantized index the slice is scored from the compressed codes; the best
+        top_k * rescore_factor candidates are then rescored against the full-precision
+        vectors (rescore_factor=0 returns the approximate scores). exact=True bypasses the
+        codes entirely.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Row ids and cosine similarities, best match first.
+        """
+        empty = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        if len(self) == 0 or top_k <= 0:
+            return empty
+
+        query = np.asarray(query_vector, dtype=np.float32).ravel()
+        query_norm = np.linalg.norm(query)
+        if query_norm == 0:
+            return empty
+        query = query / query_norm
+
+        lo, hi = self.date_slice(start_ts, end_ts)
+        eligible = self._eligible_rows(lo, hi, filters)
+        if hi == lo or (eligible is not None and eligible.size == 0):
+            return empty
+
+        if self.codes is not None and not (exact and self.vectors is not None):
+            codes = self.codes[lo:hi] if eligible is None else self.codes[eligible]
+            approx = self.quantizer.score(codes, query)
+            can_rescore = rescore_factor and self.vectors is not None
+            shortlist = _top_k(approx, top_k * rescore_factor if can_rescore else top_k)
+            candidates = lo + shortlist if eligible is None else eligible[shortlist]
+            scores = self.vectors[candidates] @ query if can_rescore else approx[shortlist]
+        elif eligible is None:
+            scores = self.vectors[lo:hi] @ query
+            candidates = np.arange(lo, hi)
+        else:
+            scores = self.vectors[eligible] @ query
+            candidates = eligible
+
+        top = _top_k(scores, top_k)
+        return candidates[top], scores[top]
+
+    def search_many(self, query_vectors: np.ndarray, top_k: int = 5,
+                    start_ts: Optional[int] = None, end_ts: Optional[int] = None,
+                    rescore_factor: int = 4, filters: Optional[Dict[str, Any]] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Batched search(): the date slice is scored against all queries with one
+        matrix-matrix product, so k queries cost about one scan of the slice instead of k.
+        Quantized indexes score each query from the codes as in search().
+
+        Returns:
+            List[Tuple[np.ndarray, np.ndarray]]: Row ids and similarities per query, in query order.
+        """
+        queries = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        if self.codes is not None:
+            return [self.search(query, top_k, start_ts, end_ts, rescore_factor=rescore_factor, filters=filters)
+                    for query in queries]
+
+        empty = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        lo, hi = self.date_slice(start_ts, end_ts)
+        eligible = self._eligible_rows(lo, hi, filters)
+        if len(self) == 0 or top_k <= 0 or hi == lo or (eligible is not None and eligible.size == 0):
+            return [empty for _ in queries]
+
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        valid = norms[:, 0] > 0
+        queries = queries / np.where(norms == 0, 1.0, norms)
+        # (rows, queries) score matrix for the whole slice in one product
+        scores = (self.vectors[lo:hi] if eligible is None else self.vectors[eligible]) @ queries.T
+
+        results = []
+        for j in range(queries.shape[0]):
+            if not valid[j]:
+                results.append(empty)
+                continue
+            column = np.ascontiguousarray(scores[:, j])
+            top = _top_k(column, top_k)
+            results.append((lo + top if eligible is None else eligible[top], column[top]))
+        return results
+
+    def row_vectors(self, rows: np.ndarray) -> np.ndarray:
+        """Normalized vectors for the given rows (decoded from the codes if full precision was dropped)."""
+        if self.vectors is not None:
+            return np.asarray(self.vectors[rows], dtype=np.float32)
+        return normalize_rows(self.quantizer.decode(self.codes[rows]))
+
+    def mmr(self, rows: np.ndarray, scores: np.ndarray, top_k: int, mmr_lambda: float = 0.7,
+            max_per_section: Optional[int] = None) -> np.ndarray:
+        """
+        Greedy maximal-marginal-relevance re-ranking of candidate rows.
+
+        Each step picks the candidate maximizing
+            mmr_lambda * sim(query, c) - (1 - mmr_lambda) * max_{s in selected} sim(c, s),
+        so mmr_lambda=1 is pure relevance and lower values favour diversity. max_per_section
+        caps how many picks may share a metadata section_name; records without a section are
+        not capped. If the cap leaves fewer than top_k picks, the remaining slots are filled
+        with the skipped candidates in order of relevance.
+
+        Args:
+            rows (np.ndarray): Candidate rows, e.g. from search().
+            scores (np.ndarray): Their similarity to the query.
+        """
+        if len(rows) == 0 or top_k <= 0:
+            return np.zeros(0, dtype=np.int64)
+        vectors = self.row_vectors(rows)
+        pairwise = vectors @ vectors.T
+        sections = [self.get_record(row).get("metadata", {}).get("section_name") for row in rows] \
+            if max_per_section else None
+
+        selected = []
+        capped = []
+        section_counts = {}
+        max_sim = np.full(len(rows), -np.inf, dtype=np.float32)
+        available = np.ones(len(rows), dtype=bool)
+        while len(selected) < top_k and available.any():
+            redundancy = np.where(np.isfinite(max_sim), max_sim, 0.0)
+            objective = mmr_lambda * scores - (1.0 - mmr_lambda) * redundancy
+            objective[~available] = -np.inf
+            best = int(np.argmax(objective))
+            available[best] = False
+            if sections is not None:
+                section = sections[best]
+                if section:
+                    if section_counts.get(section, 0) >= max_per_section:
+                        capped.append(best)
+                        continue
+                    section_counts[section] = section_counts.get(section, 0) + 1
+            selected.append(best)
+            max_sim = np.maximum(max_sim, pairwise[best])
+        if len(selected) < top_k and capped:
+            capped.sort(key=lambda position: -scores[position])
+            selected.extend(capped[:top_k - len(selected)])
+        return np.asarray(rows)[selected]
+
+    def measure_recall(self, queries: np.ndarray, top_k: int = 10, rescore_factor: int = 4, **window) -> float:
+        """Mean recall@top_k of the quantized search against exact full-precision search."""
+        if self.vectors is None:
+            raise ValueError("Recall can only be measured while full-precision vectors are kept")
+        recalls = []
+        for query in np.atleast_2d(queries):
+            exact_rows, _ = self.search(query, top_k, exact=True, **window)
+            approx_rows, _ = self.search(query, top_k, rescore_factor=rescore_factor, **window)
+            recalls.append(recall_at_k(exact_rows.tolist(), approx_rows.tolist()))
+        return float(np.mean(recalls)) if recalls else 1.0
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest scores, best first."""
+    k = min(k, scores.size)
+    if k < scores.size:
+        top = np.argpartition(-scores, k - 1)[:k]
+    else:
+        top = np.arange(scores.size)
+    return top[np.argsort(-scores[top], kind="stable")]
@@ -1,11 +1,25 @@
-from sentence_transformers import SentenceTransformer
-from backend.Kernels.FetchUtils import FetchUtils
+from backend.Kernels.FetchUtils import FetchUtils, METADATA_FIELDS
 import redis
 import pickle
 import os
 import numpy as np
 from datetime import datetime, timezone # Import datetime and timezone
 import json
+import hashlib
+import threading
+from typing import List, Optional, Tuple
+from backend.Kernels.vector_index import VectorIndex, to_epoch, parse_pub_date
+from backend.Kernels.redis_vector_store import RedisVectorStore
+from backend.Kernels.ann_index import IVFIndex
+from backend.Kernels.embedding_cache import EmbeddingCache
+from backend.Kernels.model_registry import get_model, DEFAULT_MODEL_NAME
+from backend.Kernels.binary_vector_store import binary_store_exists, load_binary_index, manifest_path, write_binary_store
+from backend.Kernels.index_watcher import IndexWatcher
+from backend.Kernels.segmented_index import SegmentedIndex
+from backend.Kernels.bounded_executor import BoundedExecutor
+from backend.Kernels.embedding_service import get_encoder
+from backend.Kernels.bm25_index import BM25Index, article_lexical_text, reciprocal_rank_fusion, weighted_score_fusion
+from backend.Kernels.archive_reader import iter_docs
 
 def cosine_similarity(vec1: np.ndarray, vec2: np.ndarray) -> float:
     """Compute cosine similarity between two vectors."""
@@ -15,39 +29,14 @@ def cosine_similarity(vec1: np.ndarray, vec2: np.ndarray) -> float:
         return 0.0
     return float(np.dot(vec1, vec2) / (norm1 * norm2))
 
-class RunVectorization:
-    def __init__(self, vector_file: str = "backend/News/vectors.json", redis_host='localhost', redis_port=6379, redis_db=0):
-        self.vector_file = vector_file
-        self.redis_client = redis.Redis(host=redis_host, port=redis_port, db=redis_db)
-        self.model = SentenceTransformer('multi-qa-MiniLM-L6-cos-v1')
-        self.vector_file = vector_file
-        # Pre-load the vectors at initialization if desired
-        with open(self.vector_file, 'r') as f:
-            self.all_data = json.load(f)
-    
-    def run_vectorization(self):
-        print("Starting vectorization process...")
-        
-        # Get articles
-        articles = FetchUtils().get_all_articles_metadata()
-        print(f"Total articles to vectorize: {len(articles)}")
-        
-        total_finished = 0
-        
-        # Process each article
-        for article in articles:
-            # Skip if already vectorized (using URL as key)
-            if article.get('web_url') and self.redis_client.exists(article['web_url']):
-                total_finished += 1
-                continue
-                
-            # Create text for vectorization
-            full_keyword_string = ""
-            if "keywords" in article:
-                for keyword in article["keywords"]:
-                    full_keyword_string += keyword["name"] + ", "
-            
-            full_text = f""" 
+def build_embedding_text(article: dict) -> str:
+    """Build the text that is embedded for an article (title, abstract, lead, snippet, keywords)."""
+    full_keyword_string = ""
+    if "keywords" in article:
+        for keyword in article["keywords"]:
+            full_keyword_string += keyword["name"] + ", "
+
+    full_text = f""" 
             {article.get('title', '')} 
             \n \
             {article.get('abstract', '')} \
@@ -58,94 +47,395 @@ class RunVectorization:
             
             {full_keyword_string}
             """
-            
-            # Vectorize article
-            vector = self.model.encode(full_text).tolist()
-            
-            # Store in Redis (URL as key, vector as value)
-            if article.get('web_url'):
-                # Store the vector
-                self.redis_client.set(article['web_url'], pickle.dumps(vector))
-                
-                # Optionally store metadata separately
-                metadata = {
-                    'title': article.get('title', ''),
-                    'abstract': article.get('abstract', ''),
-                    'lead_paragraph': article.get('lead_paragraph', ''),
-                    'snippet': article.get('snippet', ''),
-                    'pub_date': article.get('pub_date', '')
-                }
-                self.redis_client.set(f"{article['web_url']}:metadata", pickle.dumps(metadata))
-            
-            total_finished += 1
-            
-            if total_finished % 100 == 0:
+    return full_text
+
+def content_hash(text: str) -> str:
+    """Fingerprint of an article's embedding text, used to detect new or changed articles."""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def shallow_record(article: dict, vector, article_hash: str) -> dict:
+    """The record stored for an article by run_vectorization_shallow."""
+    return {
+        "web_url": article.get('web_url', ''),
+        "vector": vector,
+        "content_hash": article_hash,
+        "metadata": {
+            'title': article.get('headline', ''),
+            'abstract': article.get('abstract', ''),
+            'lead_paragraph': article.get('lead_paragraph', ''),
+            'snippet': article.get('snippet', ''),
+            'pub_date': article.get('pub_date', ''),
+            'section_name': article.get('section_name', ''),
+            'document_type': article.get('document_type', ''),
+            'keywords': [keyword.get('value', '') for keyword in article.get('keywords', [])]
+        }
+    }
+
+class RunVectorization:
+    def __init__(self, vector_file: str = "backend/News/vectors.json", redis_host='localhost', redis_port=6379, redis_db=0,
+                 ann_index_file: str = "backend/News/ann_index.npz", nprobe: int = 8,
+                 query_cache_size: int = 1024, query_cache_file: str = None, quantization: str = None,
+                 model_name: str = DEFAULT_MODEL_NAME, lexical_index_file: str = "backend/News/bm25_index.pkl",
+                 segment_dir: str = None, retrieval_workers: int = 2, retrieval_queue_size: int = 8,
+                 embedding_backend: str = None):
+        self.vector_file = vector_file
+        self.redis_client = redis.Redis(host=redis_host, port=redis_port, db=redis_db)
+        self.vector_store = RedisVectorStore(self.redis_client)
+        self.ann_index_file = ann_index_file
+        self.ann_index = IVFIndex.load(ann_index_file) if os.path.exists(ann_index_file) else None
+        if self.ann_index is not None:
+            self.ann_index.nprobe = nprobe
+        # The model itself is loaded lazily, once per process, by the model registry
+        self.model_name = model_name
+        # "torch" or "onnx" (int8 ONNX Runtime); None uses the EMBEDDING_BACKEND default
+        self.embedding_backend = embedding_backend
+        # LRU cache of query embeddings; persisted to query_cache_file when one is given
+        self.query_cache = EmbeddingCache(max_size=query_cache_size, persist_path=query_cache_file)
+        self.vector_file = vector_file
+        # Binary store written next to vector_file (see binary_vector_store)
+        self.binary_store_path = os.path.splitext(vector_file)[0]
+        # Optional compressed index ('int8' or 'pq'); None keeps exact float32 scoring
+        self.quantization = quantization
+        self.index_watcher = None
+        # (index, lexical_index, BM25 doc id -> index row), see _lexical_rows
+        self._lexical_row_cache = None
+        # BM25 index over headline, abstract, lead paragraph and keywords, keyed by web_url
+        self.lexical_index_file = lexical_index_file
+        self._lexical_lock = threading.Lock()
+        # Pre-load the vectors at initialization, preferring the memory-mapped binary store
+        self._swap_index(*self._load_snapshot())
+        # Optional time-partitioned store; when set, run_vectorization_shallow only appends segments
+        self.segments = SegmentedIndex(segment_dir, quantization=quantization) if segment_dir else None
+        # Bounded pool that runs encoding and scoring for the async entry points
+        self.executor = BoundedExecutor(max_workers=retrieval_workers, max_pending=retrieval_queue_size)
+    
+    def _load_index(self) -> VectorIndex:
+        """Build a VectorIndex from the binary store if present, otherwise from vector_file."""
+        if not binary_store_exists(self.binary_store_path) and self.quantization:
+            # Quantization only runs on the memory-mapped store: holding the JSON records, the
+            # float32 matrix and the codes in RAM together costs more than the flat index.
+            with open(self.vector_file, 'r') as f:
+                write_binary_store(json.load(f), self.binary_store_path, quantization=self.quantization)
+        if binary_store_exists(self.binary_store_path):
+            index = load_binary_index(self.binary_store_path, quantization=self.quantization)
+        else:
+            with open(self.vector_file, 'r') as f:
+                index = VectorIndex.from_records(json.load(f))
+        # The URL and attribute row maps are left to the first hybrid or filtered query
+        return index
+
+    def _load_lexical_index(self) -> Optional[BM25Index]:
+        """Load lexical_index_file; None when it is missing, so the lexical_index property builds it on first use."""
+        if os.path.exists(self.lexical_index_file):
+            return BM25Index.load(self.lexical_index_file)
+        return None
+
+    def _load_snapshot(self) -> Tuple[VectorIndex, Optional[BM25Index]]:
+        """The vector index and its BM25 index, loaded together so a reload swaps both."""
+        return self._load_index(), self._load_lexical_index()
+
+    @property
+    def lexical_index(self) -> BM25Index:
+        """
+        The BM25 index. When lexical_index_file was missing it is built from the rows of the
+        current vector index on first use (a hybrid query or an ingest) and saved, so the
+        rebuild happens once instead of on every start.
+        """
+        lexical_index = self._lexical_index
+        if lexical_index is None:
+            with self._lexical_lock:
+                if self._lexical_index is None:
+                    print(f"{self.lexical_index_file} not found, building the BM25 index from {len(self.index)} rows...")
+                    built = self._build_lexical_index(self.index)
+                    try:
+                        built.save(self.lexical_index_file)
+                    except OSError as e:
+                        print(f"Could not save the BM25 index to {self.lexical_index_file}: {e}")
+                    self._lexical_index = built
+                lexical_index = self._lexical_index
+        return lexical_index
+
+    @lexical_index.setter
+    def lexical_index(self, lexical_index: BM25Index):
+        self._lexical_index = lexical_index
+
+    @staticmethod
+    def _build_lexical_index(index: VectorIndex) -> BM25Index:
+        """Build a BM25 index from the stored metadata of every row of a VectorIndex."""
+        lexical_index = BM25Index()
+        for row in range(len(index)):
+            record = index.get_record(row)
+            if record.get('web_url'):
+                lexical_index.add(record['web_url'], article_lexical_text(record.get('metadata', {})))
+        return lexical_index
+
+    def _swap_index(self, index: VectorIndex, lexical_index: Optional[BM25Index]):
+        # A single attribute assignment each: searches that already captured self.index keep their snapshot.
+        # lexical_index None (no saved BM25 file) is rebuilt from the new index on first use.
+        self.index = index
+        self.all_data = index.records
+        self.lexical_index = lexical_index
+
+    def _lexical_rows(self, index: VectorIndex, lexical_index: BM25Index) -> np.ndarray:
+        """
+        Row of index for every BM25 doc id (len(index) for URLs it does not hold). Cached for the
+        current index / BM25 pair and extended as documents are added to the BM25 index.
+        """
+        cached = self._lexical_row_cache
+        keys = lexical_index.keys
+        if cached is not None and cached[0] is index and cached[1] is lexical_index and cached[2].size == len(keys):
+            return cached[2]
+        done = cached[2] if cached is not None and cached[0] is index and cached[1] is lexical_index else np.zeros(0, dtype=np.int64)
+        url_rows = index.url_rows()
+        missing = len(index)
+        new_rows = np.fromiter((url_rows.get(key, missing) for key in keys[done.size:len(keys)]), dtype=np.int64)
+        rows = np.concatenate([done, new_rows])
+        self._lexical_row_cache = (index, lexical_index, rows)
+        return rows
+
+    def _watched_files(self) -> List[str]:
+        """
+        The file run_vectorization_shallow publishes last: the binary store manifest once a store
+        exists, vector_file before that. Resolved on every poll, so the watcher moves to the
+        manifest when the first binary store appears.
+        """
+        manifest = manifest_path(self.binary_store_path)
+        return [manifest if os.path.exists(manifest) else self.vector_file]
+
+    def watch_index(self, interval: float = 5.0):
+        """
+        Start a background watcher that reloads the vector and BM25 indexes when the store is
+        republished (e.g. by the vectorizer cron) and swaps them in.
+        """
+        if self.index_watcher is None:
+            self.index_watcher = IndexWatcher(self._watched_files, self._load_snapshot,
+                                              lambda snapshot: self._swap_index(*snapshot), interval=interval)
+        self.index_watcher.start()
+        return self.index_watcher
+
+    def encode_texts(self, texts, batch_size: int = 256, num_workers: int = None) -> np.ndarray:
+        """
+        Encode a list of texts in batches. With num_workers > 1 the batches are spread over a
+        multi-process pool (one CPU worker per process) via encode_multi_process.
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        if num_workers and num_workers > 1 and hasattr(self.model, 'start_multi_process_pool'):
+            pool = self.model.start_multi_process_pool(target_devices=['cpu'] * num_workers)
+            try:
+                return self.model.encode_multi_process(texts, pool, batch_size=batch_size)
+            finally:
+                self.model.stop_multi_process_pool(pool)
+        return self.model.encode(texts, batch_size=batch_size)
+
+    def run_vectorization(self, batch_size: int = 256, num_workers: int = None, write_chunk: int = 4096,
+                          incremental: bool = True):
+        """
+        Vectorize articles into the Redis store.
+
+        Args:
+            batch_size (int): Number of texts per model forward pass.
+            num_workers (int, optional): Encode with a multi-process pool of this many CPU workers.
+            write_chunk (int): Articles encoded and written to Redis (pipelined) per step.
+            incremental (bool): Re-encode only articles whose embedding text fingerprint is new or
+                has changed. With False, every article whose URL is not yet stored is encoded.
+        """
+        print("Starting vectorization process...")
+        
+        # Get articles
+        articles = FetchUtils().get_all_articles_metadata(fields=METADATA_FIELDS)
+        print(f"Total articles to vectorize: {len(articles)}")
+
+        articles = [article for article in articles if article.get('web_url')]
+        urls = [article['web_url'] for article in articles]
+        texts = [build_embedding_text(article) for article in articles]
+        hashes = [content_hash(text) for text in texts]
+        # Legacy pickled vectors are invisible to contains_many; copy them over once first
+        self.migrate_legacy_keys_once()
+        stored = self.vector_store.contains_many(urls)
+
+        if incremental:
+            stored_hashes = self.vector_store.content_hashes_many(urls)
+            pending = []
+            backfill = {}
+            for i, (url, new_hash, old_hash, is_stored) in enumerate(zip(urls, hashes, stored_hashes, stored)):
+                if old_hash == new_hash:
+                    continue
+                if old_hash is None and is_stored:
+                    # Vectorized before fingerprints were recorded; adopt the current fingerprint.
+                    backfill[url] = new_hash
+                    continue
+                pending.append(i)
+            self.vector_store.set_content_hashes(backfill)
+        else:
+            # Skip if already vectorized (using URL as key)
+            pending = [i for i, is_stored in enumerate(stored) if not is_stored]
+
+        total_finished = len(articles) - len(pending)
+        print(f"{total_finished} articles unchanged, {len(pending)} to encode.")
+
+        pool = None
+        # The ONNX backend parallelizes inside ONNX Runtime and has no multi-process pool
+        if num_workers and num_workers > 1 and hasattr(self.model, 'start_multi_process_pool'):
+            pool = self.model.start_multi_process_pool(target_devices=['cpu'] * num_workers)
+
+        try:
+            for start in range(0, len(pending), write_chunk):
+                chunk = pending[start:start + write_chunk]
+                chunk_texts = [texts[i] for i in chunk]
+
+                # Vectorize the chunk
+                if pool is not None:
+                    vectors = self.model.encode_multi_process(chunk_texts, pool, batch_size=batch_size)
+                else:
+                    vectors = self.model.encode(chunk_texts, batch_size=batch_size)
+
+                # Store in Redis (raw float32 vector plus JSON metadata, see RedisVectorStore)
+                items = []
+                for i, vector in zip(chunk, vectors):
+                    article = articles[i]
+                    metadata = {
+                        'title': article.get('title', ''),
+                        'abstract': article.get('abstract', ''),
+                        'lead_paragraph': article.get('lead_paragraph', ''),
+                        'snippet': article.get('snippet', ''),
+                        'pub_date': article.get('pub_date', ''),
+                        'section_name': article.get('section_name', ''),
+                        'document_type': article.get('document_type', ''),
+                        'keywords': [keyword.get('value', '') for keyword in article.get('keywords', [])]
+                    }
+                    items.append((article['web_url'], vector, metadata))
+                    self.lexical_index.add(article['web_url'], article_lexical_text(article))
+                self.vector_store.put_many(items, content_hashes=[hashes[i] for i in chunk])
+
+                if self.ann_index is not None:
+                    self.ann_index.add(
+                        [url for url, _, _ in items],
+                        vectors,
+                        [parse_pub_date(metadata['pub_date']) or 0 for _, _, metadata in items],
+                        replace=True,
+                    )
+
+                total_finished += len(chunk)
                 print(f"Finished {total_finished} articles of {len(articles)}")
+        finally:
+            if pool is not None:
+                self.model.stop_multi_process_pool(pool)
+
+        if self.ann_index is not None:
+            self.ann_index.save(self.ann_index_file)
+        self.lexical_index.save(self.lexical_index_file)
     
-    def run_vectorization_shallow(self):
+    def run_vectorization_shallow(self, batch_size: int = 256, num_workers: int = None, incremental: bool = True):
+        """
+        Vectorize the current month into vector_file.
+
+        With incremental=True the existing file is loaded and only articles whose embedding
+        text fingerprint is new or changed are re-encoded; results are merged into the
+        existing records (keyed by web_url) instead of rewriting the store from scratch.
+        When a segment_dir is configured, only the new or changed records are appended to
+        the segmented index and vector_file is left untouched.
+        """
         print("Starting vectorization process...")
         
         current_month = 4
         current_year = 2025
 
         # Get articles
-        articles = FetchUtils().get_all_articles_metadata(month=current_month, year=current_year)
+        articles = FetchUtils().get_all_articles_metadata(month=current_month, year=current_year, fields=METADATA_FIELDS)
         print(f"Total articles to vectorize: {len(articles)}")
-        
-        total_finished = 0
-        
-        all_data = []
-
-        # Process each article
-        for article in articles:
-                
-            # Create text for vectorization
-            full_keyword_string = ""
-            if "keywords" in article:
-                for keyword in article["keywords"]:
-                    full_keyword_string += keyword["name"] + ", "
-            
-            full_text = f""" 
-            {article.get('title', '')} 
-            \n \
-            {article.get('abstract', '')} \
-            
-            {article.get('lead_paragraph', '')}
-            
-            {article.get('snippet', '')}
-            
-            {full_keyword_string}
-            """
-            
-            # Vectorize article
-            vector = self.model.encode(full_text).tolist()
-            
-            data = {
-                "web_url": article.get('web_url', ''),
-                "vector": list(vector),
-                "metadata": {
-                    'title': article.get('headline', ''),
-                    'abstract': article.get('abstract', ''),
-                    'lead_paragraph': article.get('lead_paragraph', ''),
-                    'snippet': article.get('snippet', ''),
-                    'pub_date': article.get('pub_date', '')
-                }
-            }
-
-            all_data.append(data)
-            
-            total_finished += 1
-            
-            if total_finished % 100 == 0:
-                print(f"Finished {total_finished} articles of {len(articles)}")
+
+        if self.segments is not None:
+            return self._run_vectorization_segmented(articles, batch_size=batch_size, num_workers=num_workers)
+
+        existing = {}
+        if incremental and os.path.exists(self.vector_file):
+            for item in iter_docs(self.vector_file, path=()):
+                existing[item.get('web_url') or item.get('_id', '')] = item
+
+        texts = [build_embedding_text(article) for article in articles]
+        hashes = [content_hash(text) for text in texts]
+        keys = [article.get('web_url') or article.get('_id', '') for article in articles]
+        pending = [
+            i for i, (key, new_hash) in enumerate(zip(keys, hashes))
+            if existing.get(key, {}).get('content_hash') != new_hash
+        ]
+        print(f"{len(articles) - len(pending)} articles unchanged, {len(pending)} to encode.")
+
+        # Vectorize the new or changed articles in batches
+        vectors = self.encode_texts([texts[i] for i in pending], batch_size=batch_size, num_workers=num_workers)
+
+        # Metadata is refreshed for every article; unchanged articles keep their stored vector
+        encoded = {i: vector.tolist() for i, vector in zip(pending, vectors)}
+        merged = dict(existing)
+        for i, article in enumerate(articles):
+            data = shallow_record(article, encoded[i] if i in encoded else existing[keys[i]]['vector'], hashes[i])
+            merged[keys[i]] = data
+            if data['web_url'] and (i in encoded or data['web_url'] not in self.lexical_index):
+                self.lexical_index.add(data['web_url'], article_lexical_text(article))
+
+        print(f"Finished {len(pending)} articles of {len(articles)}")
 
         # write to json file
-        with open('backend/News/vectors.json', 'w') as f:
+        all_data = list(merged.values())
+        tmp_file = f"{self.vector_file}.tmp"
+        with open(tmp_file, 'w') as f:
             json.dump(all_data, f)
+        os.replace(tmp_file, self.vector_file)
+        self.lexical_index.save(self.lexical_index_file)
+        # The binary store manifest is published last: watchers reload once it flips
+        write_binary_store(all_data, self.binary_store_path, quantization=self.quantization)
+
+        self._swap_index(load_binary_index(self.binary_store_path, quantization=self.quantization), self.lexical_index)
+
+    def _run_vectorization_segmented(self, articles, batch_size: int = 256, num_workers: int = None):
+        """Encode new or changed articles and append them to the segmented index as a new batch."""
+        articles = [article for article in articles if article.get('web_url')]
+        texts = [build_embedding_text(article) for article in articles]
+        hashes = [content_hash(text) for text in texts]
+        pending = [
+            i for i, (article, new_hash) in enumerate(zip(articles, hashes))
+            if (self.segments.lookup(article['web_url']) or {}).get('content_hash') != new_hash
+        ]
+        print(f"{len(articles) - len(pending)} articles unchanged, {len(pending)} to encode.")
+
+        vectors = self.encode_texts([texts[i] for i in pending], batch_size=batch_size, num_workers=num_workers)
+        records = [shallow_record(articles[i], vector, hashes[i]) for i, vector in zip(pending, vectors)]
+        for i in pending:
+            self.lexical_index.add(articles[i]['web_url'], article_lexical_text(articles[i]))
+
+        self.segments.add(records)
+        self.segments.flush()
+        # Fold the month's batch segments together once they pile up, so search fan-out stays bounded
+        compacted = self.segments.compact()
+        if compacted:
+            print(f"Compacted segments of {compacted} months")
+        self.lexical_index.save(self.lexical_index_file)
+        print(f"Finished {len(pending)} articles of {len(articles)}")
+
+    def search_similar_segmented(self, query_text: str, top_k: int = 5, start_date: datetime = None,
+                                 end_date: datetime = None):
+        """
+        search_similar_shallow against the segmented index: only segments overlapping the
+        date window are scored, so fresh-news queries touch just the newest segments.
+        """
+        if self.segments is None:
+            return self.search_similar_shallow(query_text, top_k=top_k, start_date=start_date, end_date=end_date)
+        query_vector = self.compute_embedding(query_text)
+        hits = self.segments.search(
+            query_vector,
+            top_k=top_k,
+            start_ts=to_epoch(start_date) if start_date is not None else None,
+            end_ts=to_epoch(end_date) if end_date is not None else None,
+        )
+        return [record for record, _ in hits]
 
 
     def get_vector(self, url):
         """Retrieve a vector by URL"""
+        vector = self.vector_store.get_vector(url)
+        if vector is not None:
+            return vector.tolist()
         vector_data = self.redis_client.get(url)
         if vector_data:
             return pickle.loads(vector_data)
@@ -153,15 +443,95 @@ class RunVectorization:
     
     def get_metadata(self, url):
         """Retrieve article metadata by URL"""
+        metadata = self.vector_store.get_metadata(url)
+        if metadata is not None:
+            return metadata
         metadata = self.redis_client.get(f"{url}:metadata")
         if metadata:
             return pickle.loads(metadata)
         return None
+
+    def migrate_legacy_keys(self):
+        """
+        Copy vectors stored under the legacy layout (pickled list at `url`, pickled
+        metadata at `url:metadata`) into the RedisVectorStore layout.
+        """
+        batch = []
+        migrated = 0
+        for key in self.redis_client.scan_iter('*'):
+            key_str = key.decode('utf-8')
+            if key_str.endswith(':metadata') or key_str.startswith(self.vector_store.prefix):
+                continue
+            try:
+                vector = pickle.loads(self.redis_client.get(key_str))
+                metadata = self.redis_client.get(f"{key_str}:metadata")
+                metadata = pickle.loads(metadata) if metadata else {}
+            except (pickle.UnpicklingError, TypeError, redis.exceptions.ResponseError) as e:
+                print(f"Skipping legacy key {key_str}: {e}")
+                continue
+            batch.append((key_str, vector, metadata))
+            if len(batch) >= self.vector_store.chunk_size:
+                self.vector_store.put_many(batch)
+                migrated += len(batch)
+                batch = []
+        if batch:
+            self.vector_store.put_many(batch)
+            migrated += len(batch)
+        print(f"Migrated {migrated} legacy vectors.")
+        return migrated
+    
+    def migrate_legacy_keys_once(self):
+        """Run migrate_legacy_keys while the RedisVectorStore layout is still empty."""
+        if self.vector_store.count() == 0:
+            return self.migrate_legacy_keys()
+        return 0
+    
+    def build_ann_index(self, nlist: int = None, nprobe: int = 8):
+        """
+        Build an IVF approximate nearest-neighbour index from every vector in the Redis store
+        and persist it to ann_index_file. Once built, run_vectorization keeps it up to date.
+        """
+        urls, vectors, pub_ts = self.vector_store.load_entries()
+        print(f"Building ANN index over {len(urls)} vectors...")
+        self.ann_index = IVFIndex(nlist=nlist, nprobe=nprobe, min_train_size=0)
+        if urls:
+            self.ann_index.add(urls, vectors, pub_ts)
+            self.ann_index.train()
+        self.ann_index.save(self.ann_index_file)
+        return self.ann_index
+
+    def search_similar_ann(self, query_text: str, top_k: int = 5, start_date: datetime = None,
+                           end_date: datetime = None, nprobe: int = None):
+        """
+        Approximate version of search_similar backed by the IVF index. nprobe overrides the
+        index default (higher = better recall, slower). Returns the same 'url'/'score'/'metadata'
+        dictionaries as search_similar.
+        """
+        if self.ann_index is None:
+            print("No ANN index loaded; falling back to exact search.")
+            return self.search_similar(query_text, top_k=top_k, start_date=start_date, end_date=end_date)
+
+        query_vector = self.compute_embedding(query_text)
+        hits = self.ann_index.search(
+            query_vector,
+            top_k=top_k,
+            nprobe=nprobe,
+            start_ts=to_epoch(start_date) if start_date is not None else None,
+            end_ts=to_epoch(end_date) if end_date is not None else None,
+        )
+        metadata = self.vector_store.get_metadata_many([url for url, _ in hits])
+        return [{'url': url, 'score': score, 'metadata': meta} for (url, score), meta in zip(hits, metadata)]
     
-    def search_similar(self, query_text: str, top_k: int = 5, start_date: datetime = None, end_date: datetime = None):
+    def search_similar(self, query_text: str, top_k: int = 5, start_date: datetime = None, end_date: datetime = None, bulk: bool = None):
         """
         Search for similar articles based on a query text, with optional date filtering.
 
+        With bulk=True the search runs against the RedisVectorStore layout: the date window is
+        resolved from the pub_date sorted set and vectors are fetched with chunked, pipelined
+        MGETs. bulk=False keeps the legacy per-key scan over pickled vectors. By default the
+        bulk layout is used once it holds vectors (see migrate_legacy_keys_once) and the legacy
+        scan otherwise.
+
         Args:
             query_text (str): The text to search for.
             top_k (int): The maximum number of results to return.
@@ -176,19 +546,37 @@ class RunVectorization:
             List[Dict[str, Any]]: A list of dictionaries, each containing 'url', 'score', and 'metadata'.
         """
         try:
-            query_vector = self.model.encode(query_text).tolist()
+            query_vector = self.compute_embedding(query_text)
         except Exception as e:
             print(f"Error encoding query text: {e}")
             return []
 
+        if bulk is None:
+            try:
+                bulk = self.vector_store.count() > 0
+            except redis.exceptions.RedisError as r_err:
+                print(f"Redis error during bulk search: {r_err}")
+                return []
+        if bulk:
+            try:
+                return self.vector_store.search(
+                    query_vector,
+                    top_k=top_k,
+                    start_ts=to_epoch(start_date) if start_date is not None else None,
+                    end_ts=to_epoch(end_date) if end_date is not None else None,
+                )
+            except redis.exceptions.RedisError as r_err:
+                print(f"Redis error during bulk search: {r_err}")
+                return []
+
         # Get all potential keys (URLs)
         all_urls = []
         try:
             # Use scan_iter for large databases to avoid blocking
             for key in self.redis_client.scan_iter('*'):
                  key_str = key.decode('utf-8')
-                 # Check if it's likely a URL key (not a metadata key)
-                 if not key_str.endswith(':metadata'):
+                 # Check if it's likely a URL key (not a metadata key or a RedisVectorStore key)
+                 if not key_str.endswith(':metadata') and not key_str.startswith(self.vector_store.prefix):
                      all_urls.append(key_str)
         except Exception as e:
             print(f"Error scanning Redis keys: {e}")
@@ -295,69 +683,172 @@ class RunVectorization:
 
     def compute_embedding(self, text: str) -> np.ndarray:
         """
-        Convert the query text into an embedding vector.
-        This function is a placeholder. In practice you might use a language model,
-        e.g., SentenceTransformers or another embedding model.
+        Convert the query text into an embedding vector. Repeated queries (after lower-casing
+        and whitespace normalization) are served from the LRU query cache; misses go through
+        the shared micro-batching encoder, so concurrent queries share a forward pass.
+        """
+        return self.query_cache.get_or_compute(text, get_encoder(self.model_name, self.embedding_backend).encode)
+
+    def compute_embeddings(self, texts, batch_size: int = 64) -> np.ndarray:
+        """
+        Embed several query texts at once: cached queries are served from the LRU cache and
+        the rest are encoded together in one model batch.
         """
-        return self.model.encode(text)
+        vectors = [self.query_cache.get(text) for text in texts]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            encoded = get_encoder(self.model_name, self.embedding_backend).encode([texts[i] for i in missing], batch_size=batch_size)
+            for i, vector in zip(missing, encoded):
+                self.query_cache.put(texts[i], vector)
+                vectors[i] = np.asarray(vector, dtype=np.float32)
+        return np.stack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+
+    @property
+    def model(self):
+        return get_model(self.model_name, self.embedding_backend)
+
+    def save_query_cache(self):
+        """Persist the query embedding cache to query_cache_file, if configured."""
+        self.query_cache.save()
         
 
-    def search_similar_shallow(self, query_text: str, top_k: int = 5, start_date: datetime = None):
+    def search_similar_shallow(self, query_text: str, top_k: int = 5, start_date: datetime = None, rescore: bool = True,
+                               diversify: bool = False, mmr_lambda: float = 0.7, fetch_k: int = None,
+                               max_per_section: int = None, filters: dict = None, end_date: datetime = None):
         """
         Search for the top_k news items that are semantically similar to the query_text,
-        filtered by publication date (start_date). It first filters and sorts the data by pub_date,
-        then computes the semantic similarity with the query embedding.
-        """
-        # If new vectors are expected to be updated, you might want to reload the file here.
-        data = self.all_data
-
-        # Filter by start_date if provided.
-        filtered_data = []
-        for item in data:
-            pub_date_str = item.get("metadata", {}).get("pub_date")
-            if not pub_date_str:
-                continue  # Skip items without a pub_date.
-            try:
-                print("RUNNING")
-                # Normalize ISO format by replacing Z with +00:00 if needed.
-                pub_date = datetime.fromisoformat(pub_date_str.replace("Z", "+00:00"))
-                pub_date = pub_date.replace(tzinfo=None)  # remove timezone for comparison
-            except ValueError:
-                print("ERROR")
-                continue  # Skip items with invalid date formats.
-            
-            if start_date is None or pub_date >= start_date:
-                filtered_data.append(item)
-
-        # Sort filtered data by publication date (ascending order; adjust as needed).
-        filtered_data.sort(
-            key=lambda x: datetime.fromisoformat(
-                x.get("metadata", {}).get("pub_date").replace("Z", "+00:00")
-            )
-        )
-        
-        print(len(filtered_data))
+        filtered by publication date (start_date, and end_date if given). Scoring is a single matrix-vector product
+        against the pre-built VectorIndex; naive start_date values are treated as UTC.
+        On a quantized index, rescore=True re-ranks the top candidates with full-precision vectors.
+
+        With diversify=True the fetch_k most similar items (default 4 * top_k) are re-ranked with
+        maximal marginal relevance: mmr_lambda trades relevance (1.0) against diversity (0.0), and
+        max_per_section caps how many results may come from the same section.
+
+        filters restricts the search to rows matching structured metadata filters, e.g.
+        {"section_name": {"U.S.", "World"}, "document_type": "article", "keywords": "Tesla"};
+        they are resolved from precomputed row-id indexes and intersected with the date slice
+        before scoring.
+        """
+        index = self.index
+        start_ts = to_epoch(start_date) if start_date is not None else None
+        end_ts = to_epoch(end_date) if end_date is not None else None
 
         # Compute the embedding for the query text.
         query_vector = self.compute_embedding(query_text)
-        
-        # Compute semantic similarity for each item.
-        scored_items = []
-        for item in filtered_data:
-            # Assuming each item has a "vector" key with its semantic vector.
-            vector = item.get("vector")
-            if vector is None:
-                continue  # Skip items without a semantic vector.
-            article_vector = np.array(vector, dtype=float)
-            similarity = cosine_similarity(query_vector, article_vector)
-            scored_items.append((similarity, item))
-        
-        # Sort items by similarity score in descending order.
-        scored_items.sort(key=lambda x: x[0], reverse=True)
-        
-        # Select the top_k items.
-        top_results = [item for similarity, item in scored_items[:top_k]]
-        return top_results
+
+        candidates_k = (fetch_k or 4 * top_k) if diversify else top_k
+        rows, scores = index.search(query_vector, top_k=candidates_k, start_ts=start_ts, end_ts=end_ts,
+                                    rescore_factor=4 if rescore else 0, filters=filters)
+        if diversify:
+            rows = index.mmr(rows, scores, top_k, mmr_lambda=mmr_lambda, max_per_section=max_per_section)
+        return [index.get_record(row) for row in rows]
+
+    def search_many(self, queries, top_k: int = 5, start_date: datetime = None, end_date: datetime = None,
+                    rescore: bool = True, filters: dict = None):
+        """
+        Run several search_similar_shallow queries against the same date window at once.
+
+        All queries are embedded in one model batch and scored with a single matrix-matrix
+        product over the date slice, so a digest of a dozen sections costs about one scan.
+
+        Args:
+            queries (List[str]): The query texts.
+            top_k (int): The maximum number of results per query.
+            start_date (datetime, optional): The earliest publication date (inclusive).
+            end_date (datetime, optional): The latest publication date (inclusive).
+            filters (dict, optional): Structured metadata filters, as in search_similar_shallow.
+
+        Returns:
+            List[List[Dict[str, Any]]]: The top_k records for each query, in query order.
+        """
+        if not queries:
+            return []
+        index = self.index
+        query_vectors = self.compute_embeddings(list(queries))
+        results = index.search_many(
+            query_vectors,
+            top_k=top_k,
+            start_ts=to_epoch(start_date) if start_date is not None else None,
+            end_ts=to_epoch(end_date) if end_date is not None else None,
+            rescore_factor=4 if rescore else 0,
+            filters=filters,
+        )
+        return [[index.get_record(row) for row in rows] for rows, _ in results]
+
+    def search_hybrid(self, query_text: str, top_k: int = 5, start_date: datetime = None, end_date: datetime = None,
+                      fusion: str = "rrf", lexical_weight: float = 0.5, fetch_k: int = None, rrf_k: int = 60,
+                      filters: dict = None):
+        """
+        Hybrid lexical + semantic search over the shallow index.
+
+        The fetch_k (default 4 * top_k) best rows by embedding similarity and by BM25 over
+        headline, abstract, lead paragraph and keywords are fused into one ranking, so exact
+        entity matches (tickers, people, NYT keywords) surface even when the embedding misses them.
+
+        Args:
+            query_text (str): The text to search for.
+            top_k (int): The maximum number of results to return.
+            start_date (datetime, optional): The earliest publication date (inclusive).
+            end_date (datetime, optional): The latest publication date (inclusive).
+            fusion (str): "rrf" (reciprocal rank fusion) or "weighted" (weighted sum of
+                min-max normalized scores).
+            lexical_weight (float): Weight of the BM25 ranking; the semantic ranking gets 1 - lexical_weight.
+            fetch_k (int, optional): Candidates taken from each ranking before fusion.
+            rrf_k (int): Rank offset used by reciprocal rank fusion.
+            filters (dict, optional): Structured metadata filters, as in search_similar_shallow.
+
+        Returns:
+            List[Dict[str, Any]]: The fused top_k records, best first.
+        """
+        index = self.index
+        fetch_k = fetch_k or 4 * top_k
+        start_ts = to_epoch(start_date) if start_date is not None else None
+        end_ts = to_epoch(end_date) if end_date is not None else None
+        lo, hi = index.date_slice(start_ts, end_ts)
+
+        query_vector = self.compute_embedding(query_text)
+        rows, scores = index.search(query_vector, top_k=fetch_k, start_ts=start_ts, end_ts=end_ts, filters=filters)
+        semantic = dict(zip(rows.tolist(), scores.tolist()))
+
+        # BM25 covers every ingested URL; keep the hits that are in this index and date window.
+        # The window and filters become a mask over BM25 doc ids, applied before ranking.
+        lexical_index = self.lexical_index
+        doc_rows = self._lexical_rows(index, lexical_index)
+        row_allowed = np.zeros(len(index) + 1, dtype=bool)  # last slot: URLs not in this index
+        if filters:
+            row_allowed[index.filter_rows(filters)] = True
+            row_allowed[:lo] = row_allowed[hi:] = False
+        else:
+            row_allowed[lo:hi] = True
+        doc_ids, lexical_scores = lexical_index.search_ids(query_text, top_k=fetch_k, mask=row_allowed[doc_rows])
+        lexical = dict(zip(doc_rows[doc_ids].tolist(), lexical_scores.tolist()))
+
+        weights = [1.0 - lexical_weight, lexical_weight]
+        if fusion == "rrf":
+            fused = reciprocal_rank_fusion([list(semantic), list(lexical)], k=rrf_k, weights=weights)
+        elif fusion == "weighted":
+            fused = weighted_score_fusion([semantic, lexical], weights)
+        else:
+            raise ValueError(f"Unknown fusion method: {fusion}")
+        return [index.get_record(row) for row, _ in fused[:top_k]]
+
+    # --- Async entry points: run the CPU-bound work on self.executor, off the event loop ---
+
+    async def acompute_embedding(self, text: str) -> np.ndarray:
+        return await self.executor.run(self.compute_embedding, text)
+
+    async def asearch_similar_shallow(self, query_text: str, **kwargs):
+        """Awaitable search_similar_shallow; accepts the same keyword arguments."""
+        return await self.executor.run(self.search_similar_shallow, query_text, **kwargs)
+
+    async def asearch_many(self, queries, **kwargs):
+        """Awaitable search_many; accepts the same keyword arguments."""
+        return await self.executor.run(self.search_many, queries, **kwargs)
+
+    async def asearch_hybrid(self, query_text: str, **kwargs):
+        """Awaitable search_hybrid; accepts the same keyword arguments."""
+        return await self.executor.run(self.search_hybrid, query_text, **kwargs)
 
 
 # if __name__ == "__main__":